@@ -77,17 +77,19 @@ def make_graph(V,E):
     {'1': ['3'], '2': ['3'], '3': ['1', '2']}
     """
     
-    g, nabo_liste = dict(), []
+    g = dict()
     for v in V: #Danner en key for hvert punkt
-        for e in E: #Tjekker alle kanter
-            if v == e[0] and v == e[1]: #Tjekker hvilket punkt skal tilføjes til nabo listen
-                nabo_liste += [e[0]]
-            elif v == e[0]:
-                nabo_liste += [e[1]]
-            elif v == e[1]:
-                nabo_liste += [e[0]]
-        g[v] = nabo_liste #Opretter key og value for et punkt
-        nabo_liste = []
+        g[v] = []
+    for e in E: #Gennemgår kanterne en gang og tilføjer hvert punkt til nabo listen for det andet punkt
+        u, v = e[0], e[1]
+        if u == v: #En løkke tilføjes kun en gang
+            if u in g:
+                g[u].append(v)
+        else:
+            if u in g:
+                g[u].append(v)
+            if v in g:
+                g[v].append(u)
     return g
 
 
@@ -132,9 +134,7 @@ def generate_vertices(g):
     ['1', '2', '3']
     """
     
-    V = [] #Mængde af kanter er tom
-    for v in g: #Alle punkter tilføjes
-        V += [v]
+    V = list(g) #Alle punkter tilføjes
     return V
 
 
@@ -153,11 +153,13 @@ def generate_edges(g):
     [['1', '3'], ['2', '3']]
     """
     
-    E = [] #Mængde af kanter er tom
+    E, tilføjet = [], set() #Mængde af kanter er tom. Kanterne gemmes også i en mængde, så det tjekkes i konstant tid om en kant er tilføjet
     for u in g: #Et punkt u og dens nabo v
         for v in g[u]:
-            if [u,v] not in E and [v,u] not in E: #Checker om kanten ikke allerede er tilføjes til mængden
+            if (u,v) not in tilføjet: #Checker om kanten ikke allerede er tilføjes til mængden
                 E += [[u,v]]
+                tilføjet.add((u,v))
+                tilføjet.add((v,u))
     return E
 
 
@@ -166,7 +168,7 @@ def add_weights(E,a,b):
     Tilføjer heltals-positive vægte til en liste af kanter, hvor vægtende er mellem a og b.
     
     Input
-    E -> en liste af kanter
+    E -> en liste af kanter, som lister eller kompakte kanter
     a -> nedre grænse for vægtene
     b -> øvre grænse for vægtene
 
@@ -179,17 +181,159 @@ def add_weights(E,a,b):
     """
     
     if 0 < a < b: #Tilføjer en vægt
-        for e in E:
+        for k in range(len(E)):
             w = r.randint(a,b)
-            e += [w]
+            if isinstance(E[k], Edge): #En kompakt kant kan ikke ændres, så den erstattes af en kant med vægten
+                E[k] = E[k]._replace(w=w)
+            else:
+                E[k] += [w]
         return E
     return print('Not correct interval for weights')
 
 
 
+"""
+De næste funktioner omdanner punkterne i en graf af form 2 til heltal 0, 1, ..., n-1.
+Det gøres én gang, når en algoritme kaldes, så algoritmen internt kan arbejde på heltal og lister indekseret af heltal,
+i stedet for at søge i listen af punkter med V.index(v) og v in S. Til sidst omdannes resultatet tilbage til punkterne.
+"""
+
+import heapq
+from array import array
+from graph_theory import ContractionHierarchy, Edge, EuclideanGraph, Graph, LandmarkTable, ShortestPathCache, ShortestPathTree, all_pairs_shortest_paths, single_source_dijkstra, terminal_distances
+
+
+def vertex_index(V):
+    """
+    Danner et indeks, som tager hvert punkt over til dets plads i listen af punkter.
+
+    Input
+    V -> en liste af punkter
+
+    Output
+    idx -> en ordbog, som tager et punkt over til et heltal
+
+    Eksempel
+    >>> vertex_index(['a','b','c'])
+    {'a': 0, 'b': 1, 'c': 2}
+    """
+
+    idx = dict()
+    for i in range(len(V)): #Hvis et punkt står flere gange, så gælder den første plads ligesom ved V.index(v)
+        if V[i] not in idx:
+            idx[V[i]] = i
+    return idx
+
+
+def index_edges(idx, E):
+    """
+    Omdanner en liste af kanter til heltal ved hjælp af et indeks fra vertex_index.
+    Kant nummer k går fra U[k] til Y[k] og har vægten W[k]. Kanter uden vægt får vægten 1.
+
+    Input
+    idx -> en ordbog, som tager et punkt over til et heltal
+    E -> en liste af kanter
+
+    Output
+    U -> en liste af heltal for det første punkt i hver kant
+    Y -> en liste af heltal for det andet punkt i hver kant
+    W -> en liste af vægtene af kanterne
+
+    Eksempel
+    >>> index_edges({'a': 0, 'b': 1, 'c': 2},[['a','b',3],['c','b',4]])
+    ([0, 2], [1, 1], [3, 4])
+    """
+
+    U, Y, W = [], [], []
+    for e in E:
+        U.append(idx[e[0]])
+        Y.append(idx[e[1]])
+        W.append(e[2] if len(e) > 2 else 1)
+    return U, Y, W
+
+
+def index_adjacency(n, U, Y, rettet=False):
+    """
+    Danner en liste, som for hvert punkt giver numrene på de kanter, der er incident med punktet, i samme rækkefølge som i E.
+    For en rettet graf gives kun kanterne, som går ud fra punktet. Kanterne, som går ind i punktet, fås ved at bytte om på U og Y.
+
+    Input
+    n -> antallet af punkter
+    U, Y -> heltals lister for kanterne fra index_edges
+    rettet -> om kanterne kun går fra U[k] til Y[k]
+
+    Output
+    adj -> en liste af lister med kant numre
+
+    Eksempel
+    >>> index_adjacency(3,[0, 2],[1, 1])
+    [[0], [0, 1], [1]]
+    >>> index_adjacency(3,[0, 2],[1, 1],rettet=True)
+    [[0], [], [1]]
+    """
+
+    adj = [[] for i in range(n)]
+    for k in range(len(U)):
+        adj[U[k]].append(k)
+        if U[k] != Y[k] and not rettet: #En løkke tilføjes kun en gang
+            adj[Y[k]].append(k)
+    return adj
+
+
+def compact_edges(E):
+    """
+    Omdanner en liste af kanter til kompakte kanter af typen Edge fra graph_theory.
+    En kompakt kant kan ikke ændres og fylder mindre end en liste, så den kan deles mellem algoritmerne uden at blive kopieret.
+    Algoritmerne i modulet tager imod kompakte kanter på samme måde som kanter af form 2. Kanter uden vægt får vægten 1.
+
+    Input
+    E -> en liste af kanter
+
+    Output
+    E -> en liste af kompakte kanter
+
+    Eksempel
+    >>> compact_edges([['a','b',3],['b','c']])
+    [Edge(u='a', v='b', w=3), Edge(u='b', v='c', w=1)]
+    """
+
+    return [Edge(*e) for e in E]
+
+
+def weight_index(E):
+    """
+    Danner et vægt-indeks, som giver vægten af kanten mellem to punkter uden at gennemsøge listen af kanter.
+    Begge rækkefølger af punkterne er nøgler, så vægte[u,v] == vægte[v,u]. Er der flere kanter mellem to punkter, så gælder den første.
+    Indekset dannes én gang per kald af en algoritme, eller gives med som argument, hvis flere algoritmer køres på samme graf.
+    For komplette grafer kan en vægtmatrice bruges i stedet, se WeightMatrix i graph_theory_matrix.
+
+    Input
+    E -> en liste af vægtet kanter eller en EuclideanGraph
+
+    Output
+    vægte -> en ordbog, som tager et par af punkter over til vægten af kanten mellem dem
+
+    Eksempel
+    >>> vægte = weight_index([['1','2',5],['1','3',7],['3','1',9]])
+    >>> vægte['2','1'], vægte['1','3']
+    (5, 7)
+    """
+
+    if isinstance(E, EuclideanGraph): #En Euklidisk graf udregner selv afstanden mellem to punkter
+        return E
+    
+    vægte = dict()
+    for e in reversed(E): #Gennemgår kanterne baglæns, så den første kant mellem to punkter bliver gemt til sidst
+        vægte[e[0],e[1]] = e[2]
+        vægte[e[1],e[0]] = e[2]
+    return vægte
+
+
+
 """
 De næste funktioner handler om graden af et punkt og kan anvendes i nogle af algoritmerne.
 Nogle versioner af grad-funktionen giver forskellige resultater.
+Alle tre gennemgår grafen en gang. For grafer i CSR form eller som matricer findes graderne med Graph.degrees i graph_theory og degrees i graph_theory_matrix.
 Den sidste funktion redegør for Håndtrykssætningen (Rosen, 10.2, s. 653).
 """
 
@@ -255,11 +399,16 @@ def degree3(g):
     {'1': 1, '2': 2, '3': 1}
     """
     
+    antal = dict() #Tæller kanterne incident med hvert punkt, hvor kantlisten kun dannes en gang
+    for e in generate_edges(g):
+        antal[e[0]] = antal.get(e[0],0) + 1
+        if e[0] != e[1]: #En løkke tælles kun en gang
+            antal[e[1]] = antal.get(e[1],0) + 1
+    
     deg = dict() #Skaber en ordbog med alle ikke isolerede punkter, som angiver deres grad
     for v in g:
-        for e in generate_edges(g):
-            if v in e:
-                deg[v] = deg.get(v,0) + 1
+        if v in antal:
+            deg[v] = antal[v]
     return deg
 
 
@@ -310,8 +459,7 @@ def fleurys(V,E):
     ['1', '2', '4', '5', '4', '3', '1']
     """
     
-    E0 = []
-    E0 += E
+    E0 = [list(e[:2]) for e in E] #Kanterne uden vægt, som slettes undervejs
     
     g = make_graph(V, E)
     deg = degree(g) #Skaber en ordbog med alle ikke isolerede punkter, som angiver deres grad
@@ -404,15 +552,20 @@ Den grådige algoritme er selvlavet (ideen er fra Andreas) og kan ikke garantere
 """
 
 
-def dijkstras(V,E,v0,vn):
+def dijkstras(V,E,v0,vn,tovejs=False,cache=None):
     """
     Dijkstras algoritme. Finder den korteste sti i en sammenhængende graf med positive vægte.
+    Skal stierne til mange slutpunkter findes, så brug dijkstras_alle, som finder dem alle i et kald.
+    Er cache givet, så gemmes hele træet fra v0 i cachen, og senere kald med samme graf og startpunkt slår stien op i træet.
+    Er E en liste, så dannes og hashes grafen ved hvert kald. Er E en Graph fra graph_theory, så gemmes dens hash, og et opslag tager konstant tid.
     
     Input
     V -> en liste af punkter
-    E -> en liste af positivt vægtet kanter
+    E -> en liste af positivt vægtet kanter eller en Graph fra graph_theory
     v0 -> et startpunkt for stien
     vn -> et slutpunkt for stien
+    tovejs -> hvis True, så søges der fra begge ender med dijkstras_tovejs
+    cache -> en ShortestPathCache fra graph_theory
     
     Output
     (path, length) -> giver den korteste sti som punktsekvens og længden af stien
@@ -420,59 +573,347 @@ def dijkstras(V,E,v0,vn):
     Eksempel
     >>> dijkstras(['1','2','3','4','5','6'],[['1','3',2],['2','3',5],['2','4',6],['3','4',10],['3','5',3],['4','5',4],['5','6',5]],'2','6')
     (['2', '3', '5', '6'], 13)
+    >>> cache = ShortestPathCache()
+    >>> dijkstras(['1','2','3'],[['1','2',1],['2','3',2]],'1','3',cache=cache), dijkstras(['1','2','3'],[['1','2',1],['2','3',2]],'1','2',cache=cache)
+    ((['1', '2', '3'], 3), (['1', '2'], 1))
+    >>> cache.cache_info().hits, cache.cache_info().misses
+    (1, 1)
+    >>> G = Graph(['1','2','3'],[['1','2',1],['2','3',2]])
+    >>> dijkstras(G.vertices,G,'1','3',cache=cache), dijkstras(G.vertices,G,'3','1',cache=cache)
+    ((['1', '2', '3'], 3.0), (['3', '2', '1'], 3.0))
     """
     
     if v0 not in V or vn not in V: #Punkterne valgt er ikke en del af grafen
         return print('Mindst et af punkterne eksisterer ikke')
+    
+    if tovejs: #Søger fra begge ender
+        return dijkstras_tovejs(V,E.edges if isinstance(E, Graph) else E,v0,vn)
+    
+    if isinstance(E, Graph): #Grafen er allerede dannet, så træet findes direkte på den
+        træ = cache.tree(E, v0) if cache is not None else single_source_dijkstra(E, v0)
+    elif cache is not None: #Hele træet fra v0 findes, så det kan bruges igen
+        træ = _cache_træ(cache,V,E,v0,('dijkstras',id(E)))
+    else:
+        træ = dijkstras_alle(V,E,v0,vn) #Stopper, når den korteste sti til vn er fundet
+    path = træ.path_to(vn)
+    if path == []: #Der er ingen sti mellem v0 og vn
+        path = [v0]
+    
+    return path, træ.distance_to(vn) #Stien og længden af stien
+
+
+def _cache_træ(cache,V,E,v0,ejer):
+    #Træet fra v0 i grafen med kanterne E, slået op i cachen eller fundet med dijkstras_alle. Ejeren er kalderens liste af kanter, så træerne for den gamle version fjernes, når listen ændres
+    G = Graph(V, E)
+    
+    def løs(G,v): #Træet deler punkterne og deres index med G, når de er ens
+        træ = dijkstras_alle(V,E,v)
+        if G.vertices == træ.vertices:
+            træ = ShortestPathTree(G.vertices, v, træ.distances, træ.predecessors, G.index)
+        return træ
+    
+    return cache.tree(G, v0, løs, infinity=100000000, owner=ejer)
+
 
-    i_0, i_n = V.index(v0), V.index(vn) #Finder index numrene for start og slutpunkt
+def dijkstras_alle(V,E,v0,vn=None):
+    """
+    Dijkstras algoritme fra et startpunkt til alle punkter i en graf med positive vægte.
+    Finder længden af den korteste sti fra v0 til hvert punkt og punktet før hvert punkt på stien, og samler dem i et korteste-sti træ.
+    Stien til et punkt findes derefter med træ.path_to(v) i tid proportional med længden af stien, så et kald besvarer alle slutpunkter.
+    
+    Input
+    V -> en liste af punkter
+    E -> en liste af positivt vægtet kanter
+    v0 -> et startpunkt for stierne
+    vn -> et slutpunkt. Hvis det er givet, så stopper algoritmen, når den korteste sti til vn er fundet
+    
+    Output
+    træ -> et ShortestPathTree fra graph_theory. træ.distances er længderne og træ.predecessors er numrene på forgængerne
+    for punkterne i samme rækkefølge som i V, hvor -1 betyder ingen forgænger
+    
+    Eksempel
+    >>> træ = dijkstras_alle(['1','2','3','4','5','6'],[['1','3',2],['2','3',5],['2','4',6],['3','4',10],['3','5',3],['4','5',4],['5','6',5]],'2')
+    >>> træ.distances, træ.predecessors
+    ([7, 0, 5, 6, 8, 13], [2, -1, 1, 1, 2, 4])
+    >>> træ.path_to('6')
+    ['2', '3', '5', '6']
+    """
+
+    idx = vertex_index(V) #Omdanner punkterne og kanterne til heltal
+    U, Y, W = index_edges(idx, E)
+    adj = index_adjacency(len(V), U, Y)
+    
+    i_0 = idx[v0] #Finder index nummeret for startpunktet og slutpunktet
+    i_n = idx[vn] if vn is not None else None
     infty = 100000000 #Uendelige sat som et enormt stort tal
     
-    L = [[infty,[]] for j in range(0,len(V))] #Label, viser længden fra v0 til en vilkårlig v. Sætter start labels til uendelig
-    L[i_0] = [0,[]] #Sætter v0's label til 0
+    L = [infty for j in range(0,len(V))] #Label, viser længden fra v0 til en vilkårlig v. Sætter start labels til uendelig
+    L[i_0] = 0 #Sætter v0's label til 0
+    forgænger = [-1 for j in range(0,len(V))] #Punktet før hvert punkt på den korteste sti fra v0
     
-    S = [] #Mængden af punkter, som allerede er taget i betragtning
+    S = [False for j in range(0,len(V))] #Om et punkt allerede er taget i betragtning
+    kø = [(0, -i_0)] #En hob af (label, -index). Ved lige labels tages punktet med højest index først
     
-    while vn not in S: #Kører algoritmen indtil en sti mellem v0 og vn er dannet
+    while kø: #Kører algoritmen indtil alle punkter, der kan nås fra v0, er taget i betragtning
         
-        mini = infty #Sætter minimal til uendelig, og derefter finder det label, som har lavest værdi
-        for j in range(0,len(V)):
-            if V[j] not in S and mini >= L[j][0]:
-                    mini, k = L[j][0], j #Label med lavest værdi gemmes i k
+        mini, k = heapq.heappop(kø) #Finder det label, som har lavest værdi
+        k = -k
+        if S[k] == True or mini > L[k]: #Punktet er allerede taget i betragtning med et lavere label
+            continue
         
-        S.append(V[k]) #Punktet med index k tilføjes til S
+        S[k] = True #Punktet med index k tilføjes til S
+        if k == i_n: #Stien mellem v0 og vn er dannet
+            break
         
-        for v in V: #Opdaterer alle labels for punkter v ikke i S, som er incident med samme kant e, som et punkt u i S
-            if v not in S:
-                for u in S:
-                    for e in E:
-                        if u in e and v in e:
-                            i_v, i_u = V.index(v), V.index(u)
-                            if L[i_u][0] + e[2] < L[i_v][0]:
-                                L[i_v][0] = L[i_u][0] + e[2] #Opdatere labels, hvis det er lavere end før
-                                L[i_v][1] = L[i_u][1] + [e] #Opdatere stien til et punkt
+        for m in adj[k]: #Opdaterer labels for punkter ikke i S, som er incident med samme kant, som punktet k. Labels fra de andre punkter i S er allerede opdateret
+            j = Y[m] if U[m] == k else U[m]
+            if S[j] == False and L[k] + W[m] < L[j]:
+                L[j] = L[k] + W[m] #Opdatere labels, hvis det er lavere end før
+                forgænger[j] = k #Opdatere stien til et punkt
+                heapq.heappush(kø, (L[j], -j))
     
-    length, path = L[i_n][0], [v0] #Omdanner labelt til længden af stien og en sti
-    for u,v,w in L[i_n][1]:
-        if u == v0 or v == v0:
-            path = [v0]
-        if u not in path:
-            path.append(u)
-        if v not in path:
-            path.append(v)
+    return ShortestPathTree(V, v0, L, forgænger) #Træet med de korteste stier fra v0
+
+
+def dijkstras_tovejs(V,E,v0,vn,rettet=False):
+    """
+    Dijkstras algoritme fra begge ender. Søger fremad fra v0 og baglæns fra vn på skift, hvor den side med det laveste label tages.
+    Hver gang en kant når et punkt, som den anden søgning også har nået, gemmes længden af stien gennem punktet, hvis den er kortest.
+    Søgningen stopper, når de laveste labels på de to sider tilsammen er mindst længden af den korteste sti fundet.
+    De to søgninger når hver kun ca. halvt så langt som en søgning fra v0, og i en stor tynd graf udforskes derfor langt færre punkter.
+    Er der flere korteste stier, så kan stien være en anden end fra dijkstras, men længden er den samme.
     
-    return path, length #Label for punktet vn, hvor værdien er længden og listen er de udforskede stier
+    Input
+    V -> en liste af punkter
+    E -> en liste af positivt vægtet kanter
+    v0 -> et startpunkt for stien
+    vn -> et slutpunkt for stien
+    rettet -> om kanterne kun går fra det første til det andet punkt. Så søges der baglæns ad kanterne ind i punkterne
+    
+    Output
+    (path, length) -> giver den korteste sti som punktsekvens og længden af stien
+    
+    Eksempel
+    >>> dijkstras_tovejs(['1','2','3','4','5','6'],[['1','3',2],['2','3',5],['2','4',6],['3','4',10],['3','5',3],['4','5',4],['5','6',5]],'2','6')
+    (['2', '3', '5', '6'], 13)
+    >>> dijkstras_tovejs(['1','2','3'],[['1','2',1],['3','2',1],['3','1',5]],'1','3',rettet=True)
+    (['1'], 100000000)
+    >>> dijkstras_tovejs(['1','2','3'],[['1','2',1],['2','3',1],['3','1',5]],'3','2',rettet=True)
+    (['3', '1', '2'], 6)
+    """
+    
+    if v0 not in V or vn not in V: #Punkterne valgt er ikke en del af grafen
+        return print('Mindst et af punkterne eksisterer ikke')
+    
+    idx = vertex_index(V) #Omdanner punkterne og kanterne til heltal
+    U, Y, W = index_edges(idx, E)
+    
+    infty = 100000000 #Uendelige sat som et enormt stort tal
+    start = [idx[v0], idx[vn]] #Søgningen fremad er side 0 og søgningen baglæns er side 1
+    fra = [U, Y] if rettet else [U, U] #En kant m går fra fra[s][m] i retningen for side s
+    til = [Y, U] if rettet else [Y, Y]
+    adj = [index_adjacency(len(V), fra[0], til[0], rettet), index_adjacency(len(V), fra[1], til[1], rettet)]
+    
+    L = [[infty for j in V], [infty for j in V]] #Labels fra v0 og til vn
+    forgænger = [[-1 for j in V], [-1 for j in V]] #Punktet før på stien fra v0 og punktet efter på stien til vn
+    S = [[False for j in V], [False for j in V]]
+    kø = [[(0, start[0])], [(0, start[1])]]
+    L[0][start[0]], L[1][start[1]] = 0, 0
+    
+    mu, møde = (0, start[0]) if start[0] == start[1] else (infty, -1) #Længden af den korteste sti fundet og punktet, hvor søgningerne mødes
+    while kø[0] and kø[1] and kø[0][0][0] + kø[1][0][0] < mu: #Stopper, når ingen kortere sti kan findes
+        
+        side = 0 if kø[0][0][0] <= kø[1][0][0] else 1 #Fortsætter søgningen med det laveste label
+        mini, k = heapq.heappop(kø[side])
+        if S[side][k] == True or mini > L[side][k]: #Punktet er allerede taget i betragtning med et lavere label
+            continue
+        S[side][k] = True
+        
+        for m in adj[side][k]: #Opdaterer labels for naboerne til k på denne side
+            j = til[side][m] if fra[side][m] == k else fra[side][m]
+            if L[side][k] + W[m] < L[side][j]:
+                L[side][j] = L[side][k] + W[m]
+                forgænger[side][j] = k
+                heapq.heappush(kø[side], (L[side][j], j))
+            if L[side][j] + L[1-side][j] < mu: #Søgningerne har mødt hinanden i j
+                mu, møde = L[side][j] + L[1-side][j], j
+    
+    if møde == -1: #Der er ingen sti mellem v0 og vn
+        return [v0], infty
+    
+    path = [møde] #Stien fra v0 til mødepunktet og derefter fra mødepunktet til vn
+    while forgænger[0][path[0]] != -1:
+        path.insert(0, forgænger[0][path[0]])
+    while forgænger[1][path[-1]] != -1:
+        path.append(forgænger[1][path[-1]])
+    
+    return [V[i] for i in path], mu #Stien og længden af stien
+
+
+def a_stjerne(V,E,v0,vn,points=None,h=None,tabel=None):
+    """
+    A* algoritmen. Finder den korteste sti mellem to punkter ligesom Dijkstras algoritme,
+    men punkterne tages i betragtning efter længden fra v0 plus et estimat h(v) af længden fra punktet til vn.
+    Er points givet, så er estimatet den lige afstand til vn, som aldrig er større end den korteste sti i en Euklidisk graf.
+    Derfor finder algoritmen stadig den korteste sti, men den udvider kun punkterne i retning af vn.
+    Er tabel givet, så er estimatet den nedre grænse fra landemærkerne i tabellen, som virker for alle grafer med positive vægte.
+    Uden points, h og tabel er estimatet 0, og algoritmen er Dijkstras algoritme.
+    
+    Input
+    V -> en liste af punkter
+    E -> en liste af positivt vægtet kanter
+    v0 -> et startpunkt for stien
+    vn -> et slutpunkt for stien
+    points -> en ordbog, der tager et punkt over til dets koordinater, f.eks. fra euklidisk
+    h -> en funktion, som tager et punkt og giver et estimat af længden til vn, der ikke er for stort
+    tabel -> en LandmarkTable fra landemærker for samme graf
+    
+    Output
+    (path, length, udvidet) -> den korteste sti som punktsekvens, længden af stien og antallet af punkter, som er udvidet
+    
+    Eksempel
+    >>> points = {'1': [0,0], '2': [1,0], '3': [2,0], '4': [0,1], '5': [0,2]}
+    >>> a_stjerne(['1','2','3','4','5'],[['1','2',1],['2','3',1],['1','4',1],['4','5',1]],'1','3',points)
+    (['1', '2', '3'], 2, 3)
+    """
+    
+    if v0 not in V or vn not in V: #Punkterne valgt er ikke en del af grafen
+        return print('Mindst et af punkterne eksisterer ikke')
+    
+    if h is None and tabel is not None: #Den nedre grænse fra landemærkerne
+        h = tabel.heuristic(vn)
+    elif h is None and points is not None: #Den lige afstand til vn
+        xn, yn = points[vn]
+        h = lambda v: ((points[v][0]-xn)**2 + (points[v][1]-yn)**2)**(1/2)
+    elif h is None:
+        h = lambda v: 0
+    
+    idx = vertex_index(V) #Omdanner punkterne og kanterne til heltal
+    U, Y, W = index_edges(idx, E)
+    adj = index_adjacency(len(V), U, Y)
+    
+    i_0, i_n = idx[v0], idx[vn] #Finder index numrene for start og slutpunkt
+    infty = 100000000 #Uendelige sat som et enormt stort tal
+    
+    L = [infty for j in range(0,len(V))] #Label, viser længden fra v0 til en vilkårlig v
+    L[i_0] = 0
+    forgænger = [-1 for j in range(0,len(V))] #Punktet før hvert punkt på den korteste sti fra v0
+    estimat = dict() #Estimatet for hvert punkt, udregnet første gang punktet nås
+    estimat[i_0] = h(v0)
+    
+    kø = [(estimat[i_0], i_0)] #En hob af (label + estimat, index)
+    udvidet = 0
+    while kø:
+        f, k = heapq.heappop(kø)
+        if f > L[k] + estimat[k]: #Punktet har fået et lavere label, siden det kom i hoben
+            continue
+        
+        udvidet += 1 #Punktet k udvides
+        if k == i_n: #Stien mellem v0 og vn er dannet
+            break
+        
+        for m in adj[k]: #Opdaterer labels for naboerne til k
+            j = Y[m] if U[m] == k else U[m]
+            if L[k] + W[m] < L[j]:
+                L[j] = L[k] + W[m]
+                forgænger[j] = k
+                if j not in estimat:
+                    estimat[j] = h(V[j])
+                heapq.heappush(kø, (L[j] + estimat[j], j))
+    
+    path = ShortestPathTree(V, v0, L, forgænger).path_to(vn) #Danner stien baglæns ud fra forgængerne
+    if path == []: #Der er ingen sti mellem v0 og vn
+        path = [v0]
+    
+    return path, L[i_n], udvidet #Stien, længden af stien og antallet af udvidede punkter
 
 
-def floyds(V,E,v0,vn):
+def landemærker(V,E,k=8):
     """
-    Floyds algoritme. Finder længden på den korteste sti i en sammenhængende graf.
+    Forberedelse til mange korteste sti forespørgsler på samme graf. Vælger k landemærker og finder længden fra hvert landemærke til alle punkter med dijkstras_alle.
+    Landemærkerne vælges et ad gangen som det punkt, der er længst fra de landemærker, der allerede er valgt, så de ligger i udkanten af grafen.
+    For to punkter u og v er |d(l,u) - d(l,v)| aldrig større end den korteste sti mellem u og v, og det største af disse tal over landemærkerne bruges som estimat i a_stjerne.
+    Tabellen kan gemmes med tabel.save(fil) og hentes igen med LandmarkTable.load(fil), så forberedelsen kun skal laves en gang.
     
     Input
     V -> en liste af punkter
     E -> en liste af positivt vægtet kanter
+    k -> antallet af landemærker
+    
+    Output
+    tabel -> en LandmarkTable fra graph_theory med længderne fra landemærkerne som et numpy array med en række for hvert punkt
+    
+    Eksempel
+    >>> tabel = landemærker(['1','2','3','4'],[['1','2',1],['2','3',2],['3','4',3]],2)
+    >>> [tabel.vertices[l] for l in tabel.landmarks], tabel.lower_bound('2','4')
+    (['4', '1'], 5)
+    >>> a_stjerne(['1','2','3','4'],[['1','2',1],['2','3',2],['3','4',3]],'1','3',tabel=tabel)
+    (['1', '2', '3'], 3, 3)
+    >>> tabel = landemærker(['1','2','3','4'],[['1','2',1],['3','4',2**40]],2)
+    >>> tabel.distances.dtype, tabel.lower_bound('3','4'), tabel.lower_bound('1','3')
+    (dtype('float64'), 1099511627776.0, inf)
+    """
+    
+    G = Graph(V, E) #Grafen dannes en gang, og punkter, som ikke kan nås, får længden uendelig i stedet for et stort tal
+    ids = [G.index[v] for v in V]
+    
+    def længder(v): #Længderne fra v til punkterne i V
+        return np.array(single_source_dijkstra(G, v).distances)[ids]
+    
+    afstand = længder(V[0]) #Længden fra det nærmeste landemærke. Det første landemærke er længst fra V[0]
+    
+    landmarks, rækker = [], []
+    while len(landmarks) < min(k, len(V)) and afstand.max() > 0:
+        l = int(afstand.argmax()) #Punktet længst fra landemærkerne
+        landmarks.append(l)
+        rækker.append(længder(V[l]))
+        afstand = np.minimum(afstand, rækker[-1]) if len(landmarks) > 1 else rækker[-1]
+    
+    distances = np.array(rækker, dtype=np.float64).reshape(len(rækker), len(V)).T.copy() #En række for hvert punkt
+    if all(isinstance(e[2], int) for e in E) and np.isfinite(distances).all(): #Heltals længder gemmes som 32 bit heltal, hvis de kan være der, og ellers som 64 bit heltal
+        if distances.max(initial=0) < 2**31:
+            distances = distances.astype(np.int32)
+        elif distances.max() < 2**53: #Større heltal kan ikke lægges præcist sammen som kommatal
+            distances = distances.astype(np.int64)
+    return LandmarkTable(V, landmarks, distances)
+
+
+def kontraktions_hierarki(V,E):
+    """
+    Forberedelse til hurtige korteste sti forespørgsler på en stor graf, som ikke ændres. Punkterne trækkes sammen et ad gangen,
+    og når et punkt fjernes, tilføjes en genvej mellem to af dets naboer, hvis den korteste sti mellem dem gik gennem punktet.
+    Punkterne fjernes i rækkefølge efter, hvor mange genveje der skal tilføjes minus antallet af kanter, der fjernes.
+    En forespørgsel er derefter to Dijkstras søgninger fra v0 og vn, som kun går op til punkter, der er fjernet senere, og de udforsker kun få punkter.
+    Se ContractionHierarchy i graph_theory.
+    
+    Input
+    V -> en liste af punkter
+    E -> en liste af positivt vægtet kanter
+    
+    Output
+    ch -> en ContractionHierarchy. ch.query(v0,vn) giver den korteste sti og længden af stien ligesom dijkstras
+    
+    Eksempel
+    >>> ch = kontraktions_hierarki(['1','2','3','4','5','6'],[['1','3',2],['2','3',5],['2','4',6],['3','4',10],['3','5',3],['4','5',4],['5','6',5]])
+    >>> ch.query('2','6')
+    (['2', '3', '5', '6'], 13.0)
+    """
+    
+    return ContractionHierarchy(Graph(V, E))
+
+
+def floyds(V,E,v0,vn,cache=None):
+    """
+    Floyds algoritme. Finder længden på den korteste sti i en sammenhængende graf.
+    Er cache givet, så slås længden op i et træ fra v0 i cachen ligesom i dijkstras. Træet findes for grafen med kun den første kant mellem hvert par af punkter,
+    da det er den kant, som algoritmen bruger. Er E en Graph fra graph_theory, så bruges den letteste kant, og et opslag tager konstant tid.
+    
+    Input
+    V -> en liste af punkter
+    E -> en liste af positivt vægtet kanter eller en Graph fra graph_theory
     v0 -> et startpunkt for stien
     vn -> et slutpunkt for stien
+    cache -> en ShortestPathCache fra graph_theory
     
     Output
     distance[(V[i_0],V[i_n])] -> længden af den korteste sti
@@ -484,82 +925,175 @@ def floyds(V,E,v0,vn):
     
     if v0 not in V or vn not in V: #Punkterne valgt er ikke en del af grafen
         return print('Mindst et af punkterne eksisterer ikke')
-
-    i_0, i_n = V.index(v0), V.index(vn) #Finder index numrene for start og slutpunkt
+    
+    if cache is not None or isinstance(E, Graph): #Længden slås op i træet fra v0
+        if isinstance(E, Graph):
+            træ, infty = (cache.tree(E, v0) if cache is not None else single_source_dijkstra(E, v0)), float('inf')
+        else:
+            E1, tilføjet = [], set() #Den første kant mellem hvert par af punkter uden løkker
+            for e in E:
+                if e[0] != e[1] and (e[0],e[1]) not in tilføjet:
+                    E1.append(e)
+                    tilføjet.add((e[0],e[1]))
+                    tilføjet.add((e[1],e[0]))
+            træ, infty = _cache_træ(cache,V,E1,v0,('floyds',id(E))), 100000000
+        if v0 == vn: #Algoritmen giver længden frem og tilbage til den nærmeste nabo, når v0 og vn er ens
+            d = min([træ.distance_to(v) for v in V if v != v0], default=infty)
+            return 2*d if d < infty else d
+        return træ.distance_to(vn)
+
+    idx = vertex_index(V) #Omdanner punkterne og kanterne til heltal
+    U, Y, W = index_edges(idx, E)
+    
+    i_0, i_n = idx[v0], idx[vn] #Finder index numrene for start og slutpunkt
     infty = 100000000 #Uendelige sat som et enormt stort tal
     
-    distance = dict()
+    distance = [[infty for j in range(len(V))] for i in range(len(V))]
 
-    for u in V: #Sætter distancen mellem to nabopunkter til vægten af kanten de er incident med og uendelig for ikke nabopunkter
-        for v in V:
-            distance[(u,v)] = infty
-            for e in E:
-                if u in e and v in e and u != v:
-                    distance[(u,v)] = e[2]
-                    break
+    for k in reversed(range(len(E))): #Sætter distancen mellem to nabopunkter til vægten af den første kant de er incident med og uendelig for ikke nabopunkter
+        if U[k] != Y[k]:
+            distance[U[k]][Y[k]] = W[k]
+            distance[Y[k]][U[k]] = W[k]
     
-    for u in V: #Opdaterer distancen mellem to punkter, hvis de kan forbindes af en sti med kortere vægt
-        for v in V:
-            for w in V:
-                if distance[(v,u)] + distance[(u,w)] < distance[(v,w)]:
-                    distance[(v,w)] = distance[(v,u)] + distance[(u,w)]
+    for u in range(len(V)): #Opdaterer distancen mellem to punkter, hvis de kan forbindes af en sti med kortere vægt
+        for v in range(len(V)):
+            d_v, d_vu, d_u = distance[v], distance[v][u], distance[u]
+            for w in range(len(V)):
+                if d_vu + d_u[w] < d_v[w]:
+                    d_v[w] = d_vu + d_u[w]
     
-    return distance[(V[i_0],V[i_n])] #Længden af stien
+    return distance[i_0][i_n] #Længden af stien
 
 
-def graadig(V,E,v0,vn):
+def graadig(V,E,v0,vn,kompatibel=False):
     """
     Graadig sti-findende algoritme, men den kan ikke garantere en optimal løsning.
+    Fra det sidste punkt på stien følges den letteste kant til et punkt, som ikke allerede er besøgt.
+    Møder algoritmen en blindgyde, så går den et punkt tilbage på stien og prøver den næste letteste kant derfra, i stedet for at starte forfra fra v0.
+    Stien gemmes som en stak, så der bruges ikke rekursion, og hver kant prøves højst en gang fra hver ende.
     
     Input
     V -> en liste af punkter
     E -> en liste af positivt vægtet kanter
     v0 -> et startpunkt for stien
     vn -> et slutpunkt for stien
+    kompatibel -> hvis True, så bruges graadig_genstart, som giver de samme stier som den oprindelige rekursive algoritme
     
     Output
-    graadig(V,R,v0,vn) -> rekursivt prøver at finde en sti i grafen, hvor en den sidste kant i den fundne sti er slettet
     (S, W) -> stien og vægten af stien, dermed længden af stien
     
     Eksempel
     >>> graadig(['1','2','3','4','5','6'],[['1','3',2],['2','3',5],['2','4',6],['3','4',10],['3','5',3],['4','5',4],['5','6',5]],'2','6')
     (['2', '3', '5', '6'], 13)
+    >>> graadig(['1','2','3','4'],[['1','2',1],['2','3',1],['1','4',5]],'1','4')
+    (['1', '4'], 5)
     """
     if v0 not in V or vn not in V: #Punkterne valgt er ikke en del af grafen
         return print('Mindst et af punkterne eksisterer ikke')
     
-    infty = 100000000 #Uendelige sat som et enormt stort tal
+    if kompatibel: #Samme stier som den oprindelige algoritme
+        return graadig_genstart(V,E,v0,vn)
+    
+    idx = vertex_index(V) #Omdanner punkterne og kanterne til heltal
+    U, Y, W = index_edges(idx, E)
+    adj = index_adjacency(len(V), U, Y)
+    for kanter in adj: #Kanterne fra hvert punkt i rækkefølge efter vægt. Ved lige vægte kommer den første kant i E først
+        kanter.sort(key=lambda m: W[m])
+    
+    i_0, i_n = idx[v0], idx[vn]
+    if i_0 == i_n: #Stien fra et punkt til sig selv
+        return [v0], 0
+    
+    besøgt = [False for j in range(len(V))] #Punkterne på stien eller i en blindgyde
+    besøgt[i_0] = True
+    S, næste, vægte = [i_0], [0], [] #Stien, den næste kant at prøve fra hvert punkt på stien og vægtene af kanterne på stien
+    
+    while S: #Kører algoritmen til en sti er fundet eller alle muligheder fra v0 er prøvet
+        k = S[-1]
+        while næste[-1] < len(adj[k]): #Finder den letteste kant til et punkt, som ikke er besøgt
+            m = adj[k][næste[-1]]
+            næste[-1] += 1
+            j = Y[m] if U[m] == k else U[m]
+            if besøgt[j] == False:
+                break
+        else: #Blindgyde, så gå et punkt tilbage på stien
+            S.pop()
+            næste.pop()
+            if vægte:
+                vægte.pop()
+            continue
+        
+        besøgt[j] = True #Tilføjer det næste punkt til stien
+        S.append(j)
+        næste.append(0)
+        vægte.append(W[m])
+        
+        if j == i_n: #Hvis stien har nået sit mål stop
+            return [V[i] for i in S], sum(vægte)
+    
+    return print('No path found', [v0], 0) #Der er ingen sti mellem v0 og vn
+
+
+def graadig_genstart(V,E,v0,vn):
+    """
+    Den oprindelige graadige algoritme, hvor kanter kan bruges en gang og punkter besøges igen.
+    Møder algoritmen en blindgyde, så slettes den sidste kant på stien fra grafen, og algoritmen starter forfra fra v0.
+    Genstarterne sker i en løkke i stedet for med rekursion, så algoritmen ikke rammer grænsen for rekursion i Python på store grafer.
+    
+    Input
+    V -> en liste af punkter
+    E -> en liste af positivt vægtet kanter
+    v0 -> et startpunkt for stien
+    vn -> et slutpunkt for stien
     
-    W, S = 0, [v0] #Sætter den kumulerede vægt til 0 og stien starter i startpunktet
+    Output
+    (S, W) -> stien og vægten af stien, dermed længden af stien
     
-    R, E0 = [], [] #Kopier kanterne i grafen
+    Eksempel
+    >>> graadig_genstart(['1','2','3','4','5','6'],[['1','3',2],['2','3',5],['2','4',6],['3','4',10],['3','5',3],['4','5',4],['5','6',5]],'2','6')
+    (['2', '3', '5', '6'], 13)
+    """
+    if v0 not in V or vn not in V: #Punkterne valgt er ikke en del af grafen
+        return print('Mindst et af punkterne eksisterer ikke')
+    
+    infty = 100000000 #Uendelige sat som et enormt stort tal
+    
+    R = [] #Kopi af kanterne i grafen, hvor kanter i blindgyder slettes
     R += E
-    E0 += E
     
-    for j in range(len(E0)): #Kører algoritmen til en sti er fundet eller den møder en blindgyde
+    while True: #Starter forfra fra v0, hver gang algoritmen møder en blindgyde
+        W, S = 0, [v0] #Sætter den kumulerede vægt til 0 og stien starter i startpunktet
+        E0 = [] #Kanterne, som ikke er brugt endnu
+        E0 += R
+        e_min = None
         
-        w_min = infty #Sætter minimal vægt til uendelig og finder den kant incident med et punkt med mindst vægt
-        for e in E0:
-            if S[j] in e and e[2] < w_min:
-                e_min, w_min = e, e[2] #Kanten med den mindste vægt gemmes
-        
-        if e_min not in E0: #Hvis algoritmen møder en blindgyde, så fjernes den sidste kant og algoritmen kører igen
-            #print(S, W)
-            R.remove(e_min)
-            return graadig(V,R,v0,vn)
+        for j in range(len(E0)): #Kører algoritmen til en sti er fundet eller den møder en blindgyde
+            
+            w_min = infty #Sætter minimal vægt til uendelig og finder den kant incident med et punkt med mindst vægt
+            for e in E0:
+                if S[j] in e and e[2] < w_min:
+                    e_min, w_min = e, e[2] #Kanten med den mindste vægt gemmes
+            
+            if e_min is None: #Der er ingen kanter fra v0
+                return print('No path found', S, W)
+            
+            if e_min not in E0: #Hvis algoritmen møder en blindgyde, så fjernes den sidste kant og algoritmen starter forfra
+                R.remove(e_min)
+                break
+            
+            E0.remove(e_min) #Fjerner kanten som lige er tilføjet til stien
+            W += w_min #Tilføjer vægten af kanten
+            
+            if S[j] == e_min[0]: #Tilføjer det næste punkt til stien
+                S += [e_min[1]]
+            elif S[j] == e_min[1]:
+                S += [e_min[0]]
         
-        E0.remove(e_min) #Fjerner kanten som lige er tilføjet til stien
-        W += w_min #Tilføjer vægten af kanten
+            if vn in S: #Hvis stien har noget sit mål stop
+                return S, W
         
-        if S[j] == e_min[0]: #Tilføjer det næste punkt til stien
-            S += [e_min[1]]
-        elif S[j] == e_min[1]:
-            S += [e_min[0]]
-    
-        if vn in S: #Hvis stien har noget sit mål stop
-            return S, W
-    
-    return print('No path found', S, W) #Hvis en fejl sker
+        else:
+            return print('No path found', S, W) #Hvis en fejl sker
 
 
 def test_sti_alg(V,E,v0,vn,di='n',fl='n',gr='n'):
@@ -584,6 +1118,54 @@ def test_sti_alg(V,E,v0,vn,di='n',fl='n',gr='n'):
         print('GRÅDIG ALGORITME\nSti', S, '\nVægt', W)
 
 
+import time
+
+
+def test_sti_tid(n,forespørgsler,euk='y',fl='y'):
+    """
+    Sammenligner tiden for kortest sti algoritmerne på en Euklidisk graf, hvor hvert punkt har kanter til sine 4 nærmeste naboer,
+    eller på en tilfældig graf fra make_random_graph med vægte mellem 1 og 20, hvis euk er no ('n').
+    Kontraktions hierarkiet er lavet til store tynde grafer som den Euklidiske, og på de tætte tilfældige grafer tager forberedelsen lang tid.
+    Tiden for kontraktions hierarkiet er delt op i forberedelsen og en forespørgsel. Længderne tjekkes mod dijkstras.
+    floyds tager O(n^3) tid for hver forespørgsel, så den kan slås fra med fl.
+    
+    n -> antallet af punkter
+    forespørgsler -> antallet af tilfældige par af punkter
+    euk -> Euklidisk graf
+    fl -> floyds
+    """
+    
+    if euk == 'y':
+        V, G, points = euklidisk(n, implicit=True)
+        E = candidate_edges(G, 4)
+    else:
+        g = make_random_graph(n)
+        V = generate_vertices(g)
+        E = add_weights(generate_edges(g),1,20)
+    par = [r.sample(V,2) for i in range(forespørgsler)]
+    samme = lambda L: all(abs(a - b) < 1e-9 or a == b == 100000000 or (a == float('inf') and b == 100000000) for a, b in zip(L, længder)) #Længderne er ens bortset fra afrunding
+    
+    start = time.perf_counter()
+    længder = [dijkstras(V, E, v0, vn)[1] for v0, vn in par]
+    print('DIJKSTRAS ALGORITME', (time.perf_counter() - start) / forespørgsler)
+    
+    start = time.perf_counter()
+    tovejs = [dijkstras(V, E, v0, vn, tovejs=True)[1] for v0, vn in par]
+    print('TOVEJS DIJKSTRAS', (time.perf_counter() - start) / forespørgsler, 'Samme længder', samme(tovejs))
+    
+    if fl == 'y':
+        start = time.perf_counter()
+        floyd = [floyds(V, E, v0, vn) for v0, vn in par]
+        print('FLOYDS ALGORITME', (time.perf_counter() - start) / forespørgsler, 'Samme længder', samme(floyd))
+    
+    start = time.perf_counter()
+    ch = kontraktions_hierarki(V, E)
+    print('KONTRAKTIONS HIERARKI\nForberedelse', time.perf_counter() - start, '\nGenveje', ch.shortcuts)
+    start = time.perf_counter()
+    hierarki = [ch.query(v0, vn)[1] for v0, vn in par]
+    print('Forespørgsel', (time.perf_counter() - start) / forespørgsler, 'Samme længder', samme(hierarki))
+
+
 
 """
 Denne sektion er om udspændende træer og indeholder to algoritmer, dybde-først-søgning og bredde-først-søgning.
@@ -731,26 +1313,92 @@ def prims(V,E):
     (['2', '4', '5', '1', '3'], [['2', '4', 1], ['2', '5', 1], ['1', '2', 50], ['2', '3', 50]])
     """
     
+    if isinstance(E, EuclideanGraph): #En Euklidisk graf har ingen liste af kanter
+        return prims_euklidisk(V, E)
+    
     infty = 100000000 #Uendelige sat som et enormt stort tal
     
+    idx = vertex_index(V) #Omdanner punkterne og kanterne til heltal
+    U, Y, W = index_edges(idx, E)
+    
     mini = infty #Finder den mindst vægtet kant i E
-    for e in E:
-        if e[2] < mini:
-            e_min, mini = e, e[2]
+    for k in range(len(E)):
+        if W[k] < mini:
+            k_min, mini = k, W[k]
             
-    ET, VT = [e_min], [e_min[0], e_min[1]] #Tilføjer den mindst vægtet kant og punkterne incident med kanten
+    ET, VT = [E[k_min]], [V[U[k_min]], V[Y[k_min]]] #Tilføjer den mindst vægtet kant og punkterne incident med kanten
+    in_tree = [False for v in V] #Om et punkt er i træet
+    in_tree[U[k_min]], in_tree[Y[k_min]] = True, True
+    
+    adj = index_adjacency(len(V), U, Y)
+    kø = [(W[k], k) for k in adj[U[k_min]] + adj[Y[k_min]]] #En hob af kanterne incident med træet som (vægt, kant nummer)
+    heapq.heapify(kø)
     
     for i in range(len(V)-2): #Tilføjer den mindst vægtet kant incident med et punkt i træet allerede
-        mini = infty
-        for e in E:
-            if e[2] < mini:
-                if e[0] in VT and e[1] not in VT:
-                    e_min, v, mini = e, e[1], e[2]
-                elif e[0] not in VT and e[1] in VT:
-                    e_min, v, mini = e, e[0], e[2]
+        while kø and in_tree[U[kø[0][1]]] and in_tree[Y[kø[0][1]]]: #Fjerner kanter, hvor begge punkter er kommet i træet
+            heapq.heappop(kø)
+        if not kø: #Grafen er ikke sammenhængende
+            break
+        
+        mini, k_min = heapq.heappop(kø) #Ved lige vægt vælges kanten, som står først i E
+        v = Y[k_min] if in_tree[U[k_min]] else U[k_min]
+        for k in adj[v]: #Kanterne incident med det nye punkt kommer i hoben
+            heapq.heappush(kø, (W[k], k))
+        
+        ET += [E[k_min]]
+        VT += [V[v]]
+        in_tree[v] = True
+    
+    return VT, ET
+
+
+def prims_euklidisk(V,G):
+    """
+    Prims algoritme for en Euklidisk graf, hvor kun punkternes koordinater er gemt.
+    Hver iteration bruger rækken af afstande fra det sidst tilføjede punkt, så algoritmen bruger O(n^2) tid og O(n) hukommelse.
+
+    Input
+    V -> en liste af punkter
+    G -> en EuclideanGraph med punkterne i V
+
+    Output
+    VT -> en liste af punkterne i træet
+    ET -> en liste af kanterne i træet
+    
+    Eksempel
+    >>> prims_euklidisk(['0','1','2'],EuclideanGraph([[0,0],[3,4],[3,0]]))
+    (['0', '2', '1'], [['0', '2', 3.0], ['1', '2', 4.0]])
+    """
+    
+    n = len(V)
+    ids = [G.index[v] for v in V] #Punkternes heltal i G
+    
+    def række(i): #Afstandene fra punkt nummer i i V til alle punkter i V
+        return G.row(ids[i])[ids]
+    
+    mini = np.inf #Finder den mindst vægtet kant
+    for i in range(n-1):
+        afstand = række(i)[i+1:]
+        j = int(np.argmin(afstand))
+        if afstand[j] < mini:
+            (u, v), mini = (i, i+1+j), afstand[j].item()
+    
+    ET, VT = [[V[u], V[v], mini]], [V[u], V[v]] #Tilføjer den mindst vægtet kant og punkterne incident med kanten
+    in_tree = np.zeros(n, dtype=bool)
+    in_tree[[u,v]] = True
+    afstand_u, afstand_v = række(u), række(v) #Afstanden fra hvert punkt til træet og punktet i træet, den er målt til
+    afstand, nabo = np.minimum(afstand_u, afstand_v), np.where(afstand_u <= afstand_v, u, v)
+    
+    for k in range(n-2): #Tilføjer det punkt, som er tættest på træet
+        v = int(np.argmin(np.where(in_tree, np.inf, afstand)))
+        u = int(nabo[v])
+        ET += [[V[min(u,v)], V[max(u,v)], afstand[v].item()]]
+        VT += [V[v]]
+        in_tree[v] = True
         
-        ET += [e_min]
-        VT += [v]
+        afstand_v = række(v) #Opdaterer afstanden til træet
+        tættere = afstand_v < afstand
+        afstand, nabo = np.where(tættere, afstand_v, afstand), np.where(tættere, v, nabo)
     
     return VT, ET
 
@@ -761,7 +1409,7 @@ def kruskals(V,E):
 
     Input
     V -> en liste af punkter
-    E -> en liste af vægtet kanter
+    E -> en liste af vægtet kanter eller en EuclideanGraph, som sendes videre til prims_euklidisk
 
     Output
     VT -> en liste af punkterne i træet
@@ -770,53 +1418,38 @@ def kruskals(V,E):
     Eksempel
     >>> kruskals(['1','2','3','4','5'],[['1','2',50],['2','3',50],['2','4',1],['2','5',1],['4','5',1]])
     (['2', '4', '5', '1', '3'], [['2', '4', 1], ['2', '5', 1], ['1', '2', 50], ['2', '3', 50]])
+    >>> kruskals(['0','1','2'],EuclideanGraph([[0,0],[3,4],[3,0]]))
+    (['0', '2', '1'], [['0', '2', 3.0], ['1', '2', 4.0]])
     """
     
-    infty = 100000000 #Uendelige sat som et enormt stort tal
+    if isinstance(E, EuclideanGraph): #Den komplette Euklidiske graf dannes ikke, i stedet bruges Prims algoritme på koordinaterne
+        return prims_euklidisk(V,E)
+    
+    idx = vertex_index(V) #Omdanner punkterne og kanterne til heltal
+    U, Y, W = index_edges(idx, E)
     
     ET, VT = [], []
-    T, i = dict(), 0 #Danner en ordbog til at holde styr på alle dannede komponenter
+    komponent = list(range(len(V))) #Holder styr på komponenterne, hvor hvert punkt peger mod et andet punkt i samme komponent
     
-    for i in range(len(V)-1):
-        mini = infty #Finder den mindst vægtet kant
-        for e in E:
-            if e[2] < mini and e not in ET:
-                if e[0] not in VT or e[1] not in VT: #Tjekker om et nyt punkt tilføjes, derfor dannes en kreds ikke
-                    e_min, mini = e, e[2]
-                    u, v = e[0], e[1]
-                else:
-                    in_tree = 0 #Begge punkter er i træet, men hvis de er i forskellige komponenter, så dannes en kreds ikke
-                    for j in T:
-                        if e[0] in T[j] and e[1] not in T[j]:
-                            in_tree += 1
-                        elif e[1] in T[j] and e[0] not in T[j]:
-                            in_tree += 1
-                    if in_tree == 2: #De er i forskellige komponenter
-                        e_min, mini = e, e[2]
-                        u, v = e[0], e[1]
-        
-        ET += [e_min] #Kanten minimal og punkter incident på kanten tilføjes til træet
-        if u not in VT:
-            VT += [u]
-        if v not in VT:
-            VT += [v]
+    def rod(u): #Finder det punkt, som repræsenterer komponenten med u, og forkorter vejen dertil undervejs
+        while komponent[u] != u:
+            komponent[u] = komponent[komponent[u]]
+            u = komponent[u]
+        return u
+    
+    i_træ = [False for v in V]
+    for k in sorted(range(len(E)), key=W.__getitem__): #Gennemgår kanterne efter vægt. Ved lige vægt kommer kanten, som står først i E, først
+        if len(ET) == len(V)-1: #Træet er udspændende
+            break
         
-        in_tree = 0 #Komponenterne opdateres
-        for j in T:
-            if u in T[j] and v not in T[j]:
-                T[j] += [v]
-                in_tree += 1
-                uj = j
-            elif v in T[j] and u not in T[j]:
-                T[j] += [u]
-                in_tree += 1
-                vj = j
-        if in_tree == 0: #En ny komponent dannes
-            T[str(i)] = [u,v]
-            i += 1
-        elif in_tree == 2: #To komponenter er sammenhængende og bliver derfor til en komponent
-            T[uj] += T[vj]
-            del T[vj]
+        ru, rv = rod(U[k]), rod(Y[k])
+        if ru != rv: #Punkterne er i forskellige komponenter, derfor dannes en kreds ikke
+            komponent[ru] = rv #Komponenterne bliver til en komponent
+            ET += [E[k]] #Kanten minimal og punkter incident på kanten tilføjes til træet
+            for u in (U[k], Y[k]):
+                if not i_træ[u]:
+                    VT += [V[u]]
+                    i_træ[u] = True
     
     return VT, ET
 
@@ -827,7 +1460,7 @@ def boruvkas(V,E):
 
     Input
     V -> en liste af punkter
-    E -> en liste af vægtet kanter
+    E -> en liste af vægtet kanter eller en EuclideanGraph, som sendes videre til prims_euklidisk
 
     Output
     V -> en liste af punkterne i træet
@@ -838,6 +1471,9 @@ def boruvkas(V,E):
     (['1', '2', '3', '4', '5'], [['1', '2', 50], ['2', '4', 1], ['2', '3', 50], ['2', '5', 1]])
     """
     
+    if isinstance(E, EuclideanGraph): #Kanterne i den komplette Euklidiske graf skal ikke gennemløbes i hver runde
+        return prims_euklidisk(V,E)
+    
     ET = [] #Kanterne i træet
     
     infty = 9999999999 #Sætter uendelige til et højt tal
@@ -954,7 +1590,7 @@ Den anden er ikke optimal, men en del hurtigere. Den tjekker ikke alle matchings
 from math import factorial
 
 
-def min_perfect_matching(V,E):
+def min_perfect_matching(V,E,vægte=None):
     """
     Bruteforce minimum perfect matching for en komplet vægtet graf.
     Algoritmen finder alle Hamiltonstier og danner derefter matchings ved at vælge hver anden kant i Hamiltonstien.
@@ -962,6 +1598,7 @@ def min_perfect_matching(V,E):
     Input
     V -> en liste af et lige antal punkter
     E -> en liste af vægtet kanter
+    vægte -> et vægt-indeks fra weight_index, som dannes ud fra E hvis det ikke er givet
 
     Output
     M[k] -> kanterne i den perfekte matching uden vægte
@@ -972,6 +1609,9 @@ def min_perfect_matching(V,E):
     ([['1', '2'], ['3', '4']], 11)
     """
     
+    if vægte is None: #Danner vægt-indekset, så vægten af en kant findes uden at gennemsøge E
+        vægte = weight_index(E)
+    
     infty = 100000000 #Uendelige sat som et enormt stort tal
     
     M = [] #Alle matchings tilføjes i listen M, hvor de starter ud med at være Hamiltonstier
@@ -1004,21 +1644,9 @@ def min_perfect_matching(V,E):
     M_W, W_min, i = [], infty, 0 #Setup til at finde vægte
     
     for m in M: #Danner vægt for hver matching
-        M_W += [[]]
-        for em in m:
-            for e in E: #Tjekker hvilken kant er ens med kanten i matchingen
-            
-                if em[0] == e[0] and em[1] == e[1]:
-                    if M_W[i] == []: #Tilføjer vægten
-                        M_W[i] = e[2]
-                    else:
-                        M_W[i] += e[2]
-                        
-                if em[0] == e[1] and em[1] == e[0]:
-                    if M_W[i] == []: #Tilføjer vægten
-                        M_W[i] = e[2]
-                    else:
-                        M_W[i] += e[2]
+        M_W += [0]
+        for em in m: #Tilføjer vægten af kanten i matchingen
+            M_W[i] += vægte[em[0],em[1]]
         
         if M_W[i] < W_min: #Hvis vægten af matchingen er mindre end matchesne før, så sættes den til minimum
             W_min = M_W[i]
@@ -1028,7 +1656,7 @@ def min_perfect_matching(V,E):
     return M[k], M_W[k] #Returnere minimum perfekt matching
 
 
-def min_maximal_matching(V,E):
+def min_maximal_matching(V,E,vægte=None):
     """
     Bruteforce minimum maximal matching for en komplet vægtet graf.
     Algoritmen finder alle Hamiltonstier og danner derefter matchings ved at vælge hver anden kant i Hamiltonstien.
@@ -1036,6 +1664,7 @@ def min_maximal_matching(V,E):
     Input
     V -> en liste af et lige antal punkter
     E -> en liste af vægtet kanter
+    vægte -> et vægt-indeks fra weight_index, som dannes ud fra E hvis det ikke er givet
 
     Output
     M_min -> kanterne i den perfekte matching
@@ -1045,6 +1674,9 @@ def min_maximal_matching(V,E):
     [['1', '2', 5], ['3', '4', 6]]
     """
     
+    if vægte is None: #Danner vægt-indekset, så vægten af en kant findes uden at gennemsøge E
+        vægte = weight_index(E)
+    
     infty = 100000000 #Uendelige sat som et enormt stort tal
     
     M = [] #Alle matchings tilføjes i listen M, hvor de starter ud med at være Hamiltonstier
@@ -1086,34 +1718,23 @@ def min_maximal_matching(V,E):
     M_W, W_min, i = [], infty, 0 #Setup til at finde vægte
         
     for m in M: #Danner vægt for hver matching
-        M_W += [[]]
-        for em in m:
-            for e in E: #Tjekker hvilken kant er ens med kanten i matchingen
-            
-                if em[0] == e[0] and em[1] == e[1]:
-                    if M_W[i] == []: #Tilføjer vægten
-                        M_W[i] = e[2]
-                    else:
-                        M_W[i] += e[2]
-                        
-                if em[0] == e[1] and em[1] == e[0]:
-                    if M_W[i] == []: #Tilføjer vægten
-                        M_W[i] = e[2]
-                    else:
-                        M_W[i] += e[2]
+        M_W += [0]
+        for em in m: #Tilføjer vægten af kanten i matchingen
+            M_W[i] += vægte[em[0],em[1]]
         
         if M_W[i] < W_min: #Hvis vægten af matchingen er mindre end matchesne før, så sættes den til minimum
             W_min = M_W[i]
             k = i
         i += 1
     
+    kant = dict() #Finder den første kant i E mellem to punkter
+    for e in reversed(E):
+        kant[e[0],e[1]], kant[e[1],e[0]] = e, e
+    
     M_min = []
     for e0 in M[k]:
         u, v = e0
-        for e in E:
-            if u in e and v in e:
-                M_min.append(e)
-                break
+        M_min.append(kant[u,v])
                 
            
     return M_min #Returnere minimum maximal matching
@@ -1122,19 +1743,71 @@ def min_maximal_matching(V,E):
 
 """
 Denne sektion er om dannelse af metriske grafer fra sammenhængende simple grafer.
-make_complete funktionen er mere effektiv (hurtigere) end make_complete2, men de anvender begge Dijkstras algoritme.
+make_complete og make_complete2 finder begge længderne af de korteste stier mellem alle par af punkter på en gang med metrisk_matrix.
+De giver de samme længder, men make_complete2 beholder kanterne fra E forrest i listen.
 """
 
 
-def make_complete(V,E):
+def metrisk_matrix(V,E,processes=None,terminaler=None):
+    """
+    Finder længden af den korteste sti mellem alle par af punkter på en gang.
+    For tynde grafer køres Dijkstras algoritme med en hob fra hvert punkt, og for tætte grafer bruges en vektoriseret Floyd-Warshall, som med processes > 1 køres blokvis på flere kerner, se all_pairs_shortest_paths i graph_theory.
+    Er terminaler givet, så findes kun længderne mellem dem. Dijkstras algoritme køres fra hver terminal og stopper, når alle terminalerne er nået,
+    så for få terminaler i en stor graf udforskes kun en lille del af grafen, se terminal_distances i graph_theory.
+    
+    Input
+    V -> en liste med punkter
+    E -> en liste af positivt vægtet kanter
+    processes -> antallet af processer, som de korteste stier fra hvert punkt deles ud på for tynde grafer, eller antallet af tråde i den blokvise Floyd-Warshall for tætte grafer
+    terminaler -> en liste af punkter i V, f.eks. punkterne med ulige grad i et minimum udspændende træ
+    
+    Output
+    D -> et numpy array, hvor række og søjle i hører til V[i], eller terminaler[i]. Par uden en sti imellem sig og diagonalen er np.inf, som i graph_theory_matrix
+    
+    Eksempel
+    >>> metrisk_matrix(['1','2','3'],[['1','3',7],['2','3',3]])
+    array([[inf, 10.,  7.],
+           [10., inf,  3.],
+           [ 7.,  3., inf]])
+    >>> metrisk_matrix(['1','2','3','4'],[['1','3',7],['2','3',3],['3','4',1]],terminaler=['4','1'])
+    array([[inf,  8.],
+           [ 8., inf]])
+    """
+    
+    graf = Graph(V, E) #Grafen i CSR form, hvor de korteste stier mellem alle par af punkter findes på en gang
+    if terminaler is not None: #Kun længderne mellem terminalerne
+        return terminal_distances(graf, terminaler)
+    D = all_pairs_shortest_paths(graf, processes=processes) #Johnsons algoritme for tynde grafer og ellers Floyd-Warshall, blokvis med flere processer
+    
+    ids = np.array([graf.index[v] for v in V], dtype=np.int64)
+    if len(graf) == len(V) and np.array_equal(ids, np.arange(len(V))): #Punkterne har allerede samme rækkefølge som i V
+        return D
+    return D[np.ix_(ids, ids)]
+
+
+def _metriske_længder(V,E,D):
+    #Længderne fra D for alle par af punkter i rækkefølge, med uendelig som et stort tal og heltal for heltals vægte
+    infty = 100000000 #Uendelige sat som et enormt stort tal
+    I, J = np.triu_indices(len(V), 1) #Alle par af punkter i rækkefølge
+    L = D[I, J]
+    L = np.where(np.isinf(L), infty, L).tolist() #Punkter uden en sti imellem sig får vægten uendelig
+    if all(isinstance(e[2], int) for e in E): #Heltals vægte giver heltals længder
+        L = [int(l) for l in L]
+    return I.tolist(), J.tolist(), L
+
+
+def make_complete(V,E,processes=None,matrix=False,terminaler=None):
     """
     Danner en komplet graf ud fra en sammenhængende graf.
     Hver kant er vægtet ud fra den korteste sti mellem de to punkter i kanten.
-    Bedre end make_complete.
+    Er terminaler givet, så dannes kun den komplette graf på terminalerne.
     
     Input
     V -> en liste med punkter
     E -> en liste af positivt vægtet kanter
+    processes -> antallet af processer, som de korteste stier fra hvert punkt deles ud på for tynde grafer, eller antallet af tråde i den blokvise Floyd-Warshall for tætte grafer
+    matrix -> hvis True, så gives længderne som et numpy array fra metrisk_matrix i stedet for en liste af kanter
+    terminaler -> en liste af punkter i V
     
     Output
     E0 -> en liste af positivt vægtet kanter
@@ -1142,52 +1815,32 @@ def make_complete(V,E):
     Eksempel
     >>> make_complete(['1','2','3','4'],[['1','3',7],['2','3',3],['2','4',4]])
     [['1', '2', 10], ['1', '3', 7], ['1', '4', 14], ['2', '3', 3], ['2', '4', 4], ['3', '4', 7]]
+    >>> make_complete(['1','2','3','4'],[['1','3',7],['2','3',3],['2','4',4]],terminaler=['1','2','4'])
+    [['1', '2', 10], ['1', '4', 14], ['2', '4', 4]]
     """
     
-    E0 = [] #Kanterne i den metriske graf
+    D = metrisk_matrix(V,E,processes,terminaler)
+    if matrix:
+        return D
     
-    infty = 100000000 #Uendelige sat som et enormt stort tal
-    
-    for i in range(len(V)-1): #Gentager processen, så alle kanter dannes. Hver iteration starter med at vælge et punkt w
-        
-        L = [infty for j in range(0,len(V))] #Label, viser længden fra w til en vilkårlig v. Sætter start labels til uendelig
-        L[i] = 0 #Sætter w's label til 0
-        
-        S = [] #Mængden af punkter, som allerede er taget i betragtning
-        
-        while len(S) != len(V): #Kører algoritmen indtil en sti mellem w og alle andre punkter er fundet
-            
-            mini = infty #Sætter minimal til uendelig, og derefter finder det label, som har lavest værdi
-            for j in range(0,len(V)):
-                if V[j] not in S and mini >= L[j]:
-                        mini, k = L[j], j #Label med lavest værdi gemmes i k
-            
-            S.append(V[k]) #Punktet med index k tilføjes til S
-                                        
-            for v in V: #Opdaterer alle labels for punkter v ikke i S, som er incident med samme kant e, som et punkt u i S
-                if v not in S:
-                    for u in S:
-                        for e in E:
-                            if u in e and v in e:
-                                i_v, i_u = V.index(v), V.index(u)
-                                if L[i_u] + e[2] < L[i_v]:
-                                    L[i_v] = L[i_u] + e[2] #Opdatere labels, hvis det er lavere end før
-        
-        for j in range(i+1, len(V)): #Danner kanter med vægt fra labels
-            E0.append([V[i], V[j], L[j]])
+    T = V if terminaler is None else terminaler
+    I, J, L = _metriske_længder(T,E,D)
+    E0 = [[T[i], T[j], l] for i, j, l in zip(I, J, L)] #Kanterne i den metriske graf
         
     return E0
     
 
-def make_complete2(V,E):
+def make_complete2(V,E,processes=None,matrix=False):
     """
     Danner en komplet graf ud fra en sammenhængende graf.
-    Hver tilføjet kant er vægtet ud fra den mindste sti mellem punkterne i kanten.
-    Værre end make_complete.
+    Kanterne i E beholdes forrest og vægtes med den korteste sti mellem punkterne, hvis den er kortere end kanten.
+    Derefter tilføjes en kant for hvert par af punkter uden en kant, vægtet ud fra den korteste sti mellem punkterne.
     
     Input
     V -> en liste med punkter
     E -> en liste af positivt vægtet kanter
+    processes -> antallet af processer, som de korteste stier fra hvert punkt deles ud på for tynde grafer, eller antallet af tråde i den blokvise Floyd-Warshall for tætte grafer
+    matrix -> hvis True, så gives længderne som et numpy array fra metrisk_matrix i stedet for en liste af kanter
     
     Output
     E0 -> en liste af positivt vægtet kanter
@@ -1197,24 +1850,23 @@ def make_complete2(V,E):
     [['1', '3', 7], ['2', '3', 3], ['2', '4', 4], ['1', '2', 10], ['1', '4', 14], ['3', '4', 7]]
     """
     
+    D = metrisk_matrix(V,E,processes)
+    if matrix:
+        return D
+    
+    første = dict() #Nummeret på den første kant mellem hvert par af punkter
+    for m in reversed(range(len(E))):
+        første[(E[m][0],E[m][1])] = første[(E[m][1],E[m][0])] = m
+    
     E0 = [] #Danner en ny liste med kanter
     E0 += E
-    
-    for i in range(len(V)-1): #For alle par punkter
-        for j in range(i+1,len(V)):
-            
-            not_edge = True #Tjek om parret er i en kant
-            for e in E:
-                if V[i] in e and V[j] in e:
-                    s, w = dijkstras(V,E0,V[i],V[j])
-                    if e[2] > w:
-                        e[2] = w
-                    not_edge = False
-                    break
-                
-            if not_edge == True: #Hvis nej, så dan en kant med længde på den mindste sti mellem punkterne.
-                s, w = dijkstras(V,E0,V[i],V[j])
-                E0.append([V[i],V[j],w])
+    for i, j, w in zip(*_metriske_længder(V,E,D)): #For alle par punkter
+        m = første.get((V[i],V[j]))
+        if m is None: #Hvis parret ikke er i en kant, så dan en kant med længde på den mindste sti mellem punkterne
+            E0.append([V[i],V[j],w])
+        elif E0[m][2] > w: #Kanten erstattes af en kortere kant, så kanterne i E ikke ændres
+            e = E0[m]
+            E0[m] = e._replace(w=w) if isinstance(e, Edge) else [e[0], e[1], w]
     
     return E0 #Returnerer kanterne for en komplet graf
 
@@ -1249,7 +1901,7 @@ Ant optimization anvender et princip ved myretue kolonier, hvor myre ligger fero
 """
 
 
-def brute_force(V,E):
+def brute_force(V,E,vægte=None):
     """
     Finder løsningen til Den Handelsrejsendes problem med Brute Force.
     Danner alle Hamiltonkredse og vælger den med mindst vægt.
@@ -1257,6 +1909,7 @@ def brute_force(V,E):
     Input
     V -> en liste af punkter
     E -> en liste af vægtet kanter
+    vægte -> et vægt-indeks fra weight_index, som dannes ud fra E hvis det ikke er givet
 
     Output
     h_min -> punktsekvensen af Hamiltonkredsen med mindst vægt
@@ -1267,11 +1920,16 @@ def brute_force(V,E):
     (['1', '2', '3', '4', '1'], 28)
     """
     
+    if vægte is None: #Danner vægt-indekset, så vægten af en kant findes uden at gennemsøge E
+        vægte = weight_index(E)
+    
+    w_ij = [[vægte.get((u,v)) for v in V] for u in V] #Vægtene mellem punkterne, hvor Hamiltonkredsene dannes af heltal
+    
     H = [] #Alle Hamiltonkredse tilføjes i listen H
     m = [factorial(i) for i in range(len(V))] #Antal kombinationer ved et hvis trin i at danne Hamiltonkredsene
     
-    for i in range(m[-1]): #Tilføjer det første punkt til alle Hamiltonkredse
-        H.append([])
+    for i in range(m[-1]): #Tilføjer det første punkt til alle Hamiltonkredse. Hver kreds er et array af heltal
+        H.append(array('i'))
     
     for j in range(len(V)): #Danner Hamiltonstier
         k = j
@@ -1281,40 +1939,41 @@ def brute_force(V,E):
                 k += 1
                 if k >= len(V):
                     k = 1
-                while V[k] in H[i]:
+                while k in H[i]:
                     k += 1
                     if k >= len(V):
                         k = 1
                         
-            H[i].append(V[k]) #Tilføjer et punkt
+            H[i].append(k) #Tilføjer et punkt
     
     for h in H: #Tilføjer startpunktet, så Hamiltonstierne bliver til kredse
-        h += [V[0]]
+        h.append(0)
         
     w_min, h_min = 99999999999, []
     for h in H: #Udregner vægten af hver Hamiltonkreds og finder den mindste
         w = 0
         for j in range(len(h)-1):
-            for e in E:
-                if h[j] in e and h[j+1] in e:
-                    w += e[2]
-                    break
+            w += w_ij[h[j]][h[j+1]]
         if w_min > w:
             w_min = w
             h_min = h
     
-    return h_min, w_min #Returnerer Hamiltonkredsen og længden af den
+    return [V[i] for i in h_min], w_min #Returnerer Hamiltonkredsen og længden af den
 
 
-def nærmest_nabo(V, E):
+def nærmest_nabo(V, E, vægte=None, startpunkter=None):
     """
     Finder en Hamiltonkreds, ved at starte i et punkt og derefter fortsætte til det næste punkt ad kanten med lavest vægt.
     Starter i alle punkter og tager den mindst vægtet Hamiltonkreds.
     Grafen skal være metrisk (komplet og overholde trekantsuligheden).
+    E kan også være en kandidatgraf fra candidate_edges, hvor vægte er den fulde Euklidiske graf.
+    Er alle naboer i E besøgt, så fortsættes til det nærmeste punkt, som ikke er besøgt, ud fra vægte.
 
     Input
     V -> en liste af punkter
     E -> en liste af vægtet kanter
+    vægte -> et vægt-indeks fra weight_index, som dannes ud fra E hvis det ikke er givet
+    startpunkter -> en liste af de punkter, kredsen startes i. Som standard startes i alle punkter
 
     Output
     H -> punktsekvensen af Hamiltonkredsen med mindst vægt fundet
@@ -1323,68 +1982,85 @@ def nærmest_nabo(V, E):
     Eksempel
     >>> nærmest_nabo(['1','2','3','4'],[['1','2',5],['1','3',7],['1','4',9],['2','3',8],['2','4',10],['3','4',6]])
     (['1', '2', '3', '4', '1'], 28)
+    >>> nærmest_nabo(['2','0','3','1'],EuclideanGraph([[0,0],[3,0],[3,4],[0,4],[9,9]]))
+    (['2', '3', '0', '1', '2'], 14.0)
     """
     
+    if vægte is None: #Danner vægt-indekset, så vægten af en kant findes uden at gennemsøge E
+        vægte = weight_index(E)
+    
     infty = 9999999999999
     
-    H_liste = [] #Gemmer Hamiltonkredsene
-    for k in range(len(V)):
-        Vh, Eh = [], [] #Setup af mængder
-        Vh += V
-        Eh += E
-        
-        S, start, NP = [], Vh[k], Vh[k] #Setup af kredsen
-        Vh.remove(NP)
+    idx = vertex_index(V) #Omdanner punkterne til heltal
+    euklidisk_graf = isinstance(E, EuclideanGraph)
+    if euklidisk_graf: #Punkternes heltal i den Euklidiske graf, som ikke behøver at have samme rækkefølge som V
+        E_ids = [E.index[v] for v in V]
+    else: #Kanterne incident med hvert punkt, i samme rækkefølge som i E
+        U, Y, w_e = index_edges(idx, E)
+        adj = index_adjacency(len(V), U, Y)
+    if isinstance(vægte, EuclideanGraph): #Punkternes heltal i den Euklidiske graf
+        ids = [vægte.index[v] for v in V]
+    
+    def nærmeste_ubesøgte(NP, besøgt): #Finder det nærmeste punkt, som ikke er besøgt, blandt alle punkter ud fra vægte
+        if isinstance(vægte, EuclideanGraph):
+            afstand = np.where(besøgt, np.inf, vægte.row(ids[NP])[ids])
+            næste = int(np.argmin(afstand))
+            return næste, afstand[næste].item()
+        næste, tempW = None, infty
+        for j in range(len(V)):
+            if besøgt[j] == False and vægte.get((V[NP],V[j]), infty) < tempW:
+                næste, tempW = j, vægte[V[NP],V[j]]
+        return næste, tempW
+    
+    if startpunkter is None:
+        startpunkter = range(len(V))
+    else:
+        startpunkter = [idx[v] for v in startpunkter]
+    
+    w_min = infty #Gemmer den Hamiltonkreds med mindst vægt som en punktsekvens af heltal
+    for k in startpunkter:
+        besøgt = np.zeros(len(V), dtype=bool) if euklidisk_graf else [False for v in V] #Setup af kredsen
+        P, NP = array('i', [k]), k
+        besøgt[NP] = True
         W = 0
      
-        while Vh != []: #Fortsætter til en Hamiltonsti er dannet
-            tempW = infty #Minimal vægt sættes til uendelig
-            
-            for i in range(len(Eh)): #Finder den kant incident med NP med mindst vægt, som ikke danner en kreds
-                if Eh[i][0] == NP and Eh[i][1] in Vh and Eh[i][2] < tempW:
-                    tempE, tempW = Eh[i], Eh[i][2]
-                elif Eh[i][1] == NP and Eh[i][0] in Vh and Eh[i][2] < tempW:
-                    tempE, tempW = Eh[i], Eh[i][2]
+        while len(P) < len(V): #Fortsætter til en Hamiltonsti er dannet
+            if euklidisk_graf: #Finder det nærmeste punkt, som ikke er besøgt, ud fra rækken af afstande fra NP
+                afstand = np.where(besøgt, np.inf, E.row(E_ids[NP])[E_ids])
+                næste = int(np.argmin(afstand))
+                tempW = afstand[næste].item()
+            else:
+                tempW = infty #Minimal vægt sættes til uendelig
+                for m in adj[NP]: #Finder den kant incident med NP med mindst vægt, som ikke danner en kreds
+                    j = Y[m] if U[m] == NP else U[m]
+                    if besøgt[j] == False and w_e[m] < tempW:
+                        næste, tempW = j, w_e[m]
+                if tempW == infty: #Alle naboer er besøgt
+                    næste, tempW = nærmeste_ubesøgte(NP, besøgt)
+                if næste is None: #Ingen kant i vægte fører til et punkt, som ikke er besøgt
+                    raise ValueError(f'Der er ingen kant fra {V[NP]} til et punkt, som ikke er besøgt, så der kan ikke dannes en Hamiltonkreds')
             
-            Eh.remove(tempE) #Opdaterer det nuværende punkt
-            if tempE[0] == NP:
-                NP = tempE[1]
-            elif tempE[1] == NP:
-                NP = tempE[0]
-            S.append(tempE) #Tilføjer kanten til Hamiltonstien
-            Vh.remove(NP) #Tilføjer punktet til de besøgte punkter
+            NP = næste #Opdaterer det nuværende punkt og tilføjer det til de besøgte punkter
+            P.append(NP)
+            besøgt[NP] = True
+            W += tempW
             
-        for i in range(len(Eh)): #Tilføjer en sidste kant for at færdiggøre Hamiltonkredsen
-            if Eh[i][0] == NP and Eh[i][1] == start:
-                S.append(Eh[i])
-            elif Eh[i][1] == NP and Eh[i][0] == start:
-                S.append(Eh[i])
-                
-        for i in range(len(S)): #Udregner vægten af Hamiltonkredsen
-            W += S[i][2]
-
-        H_liste.append([S,W,start]) #Tilføjer kredsen
+        W += vægte[V[NP],V[k]] #Tilføjer en sidste kant for at færdiggøre Hamiltonkredsen
         
-    w_min = infty #Finder den kreds med mindst vægt
-    for k in range(len(V)):
-        if H_liste[k][1] < w_min:
-            S, w_min, start_min = H_liste[k]
+        if W < w_min: #Gemmer kredsen, hvis den har mindst vægt
+            P_min, w_min = P, W
     
-    H, incl = [V[0]], []
-    while len(H) < len(V)+1: #Danner en punktssekvens for Hamiltonkredsen
-        for e in S:
-            if H[-1] in e and e not in incl:
-                incl.append(e)
-
-                if H[-1] == e[0]:
-                    H.append(e[1])
-                elif H[-1] == e[1]:
-                    H.append(e[0])
+    i = P_min.index(0) #Danner en punktssekvens for Hamiltonkredsen, som starter i V[0] og følger den første kant i kredsen med V[0]
+    if i == 0:
+        H = P_min + array('i', [0])
+    else:
+        H = P_min[i::-1] + P_min[:i:-1] + P_min[i:i+1]
+    H = [V[i] for i in H]
      
     return H, w_min #Returnerer Hamiltonkredsen og vægten af den
 
 
-def nærmest_addition(V,E):
+def nærmest_addition(V,E,vægte=None):
     """
     Danner en kreds med to punkter med kanten af minimum vægt.
     Tilføjer det punkt, som er tættest på et punkt i kredsen.
@@ -1393,6 +2069,7 @@ def nærmest_addition(V,E):
     Input
     V -> en liste af punkter
     E -> en liste af vægtet kanter
+    vægte -> et vægt-indeks fra weight_index, som dannes ud fra E hvis det ikke er givet
 
     Output
     H0 -> punktsekvensen af Hamiltonkredsen med mindst vægt fundet
@@ -1403,6 +2080,9 @@ def nærmest_addition(V,E):
     (['1', '4', '3', '2', '1'], 28)
     """
     
+    if vægte is None: #Danner vægt-indekset, så vægten af en kant findes uden at gennemsøge E
+        vægte = weight_index(E)
+    
     infty = 100000000 #Uendelige sat som et enormt stort tal
     
     mini = infty #Finder den mindst vægtet kant i E
@@ -1429,34 +2109,24 @@ def nærmest_addition(V,E):
         i = H.index(u) #Finder indexet af punktet både i e_min og H
 
         if i == 0: #Hvis indexet er nul, så u er i starten og slutningen
-            for e in E:
-                if v in e and H[1] in e: #Finder kanter med v og nabopunkterne til u i H
-                    e1 = e
-                if v in e and H[-2] in e:
-                    e2 = e
+            w1, w2 = vægte[v,H[1]], vægte[v,H[-2]] #Finder vægtene af kanterne med v og nabopunkterne til u i H
             
-            if e1[2] <= e2[2]: #Indsætter v i H, hvor det giver mindst mulig vægt
+            if w1 <= w2: #Indsætter v i H, hvor det giver mindst mulig vægt
                 H.insert(1,v)
             else:
                 H.insert(-2,v)
         
         else: #Hvis indexet af u viser, at u ligger midt på stien
-            for e in E:
-                if v in e and H[i-1] in e: #Finder kanter med v og nabopunkterne til u i H
-                    e1 = e
-                if v in e and H[i+1] in e:
-                    e2 = e
+            w1, w2 = vægte[v,H[i-1]], vægte[v,H[i+1]] #Finder vægtene af kanterne med v og nabopunkterne til u i H
             
-            if e1[2] <= e2[2]: #Indsætter v i H, hvor det giver mindst mulig vægt
+            if w1 <= w2: #Indsætter v i H, hvor det giver mindst mulig vægt
                 H.insert(i,v)
             else:
                 H.insert(i+1,v)
     
     W = 0
     for i in range(len(H)-1): #Udregner vægten af Hamiltonkredsen
-        for e in E:
-            if H[i] in e and H[i+1] in e:
-                W += e[2]
+        W += vægte[H[i],H[i+1]]
     
     if H[0] != V[0]: #Omformulerer punktssekvensen for Hamiltonkredsen
         i = H.index(V[0])
@@ -1467,7 +2137,7 @@ def nærmest_addition(V,E):
     return H0, W #Returnerer Hamiltonkredsen og vægten af den
 
 
-def dobbelttræ(V,E):
+def dobbelttræ(V,E,vægte=None):
     """
     Finder en tilnærmet løsning for Den Handelsrejsendes Problem med dobbelttræ metoden.
     Finder et minimum udspændende træ.
@@ -1478,6 +2148,7 @@ def dobbelttræ(V,E):
     Input
     V -> en liste af punkter
     E -> en liste af vægtet kanter
+    vægte -> et vægt-indeks fra weight_index, som dannes ud fra E hvis det ikke er givet
 
     Output
     H -> punktsekvensen af Hamiltonkredsen med mindst vægt fundet
@@ -1488,6 +2159,9 @@ def dobbelttræ(V,E):
     (['1', '2', '3', '4', '1'], 28)
     """
     
+    if vægte is None: #Danner vægt-indekset, så vægten af en kant findes uden at gennemsøge E
+        vægte = weight_index(E)
+    
     VT, ET = prims(V, E) #Finder det minimum udspændende træ
     
     E_dob = [] #Dobbler træet uden vægte
@@ -1508,9 +2182,7 @@ def dobbelttræ(V,E):
     
     hamilton = [] #Danner Hamiltonkredsen med vægte
     for u, v in cut_edge:
-        for e in E:
-            if u in e and v in e:
-                hamilton.append(e)
+        hamilton.append([u, v, vægte[u,v]])
     
     length = 0 #Udregner længden af Hamiltonkredsen
     for e in hamilton:
@@ -1530,7 +2202,7 @@ def dobbelttræ(V,E):
     return H, length #Returnerer Hamiltonkredsen og længden af den
 
 
-def christofides(V,E):
+def christofides(V,E,vægte=None):
     """
     Finder en tilnærmet løsning for Den Handelsrejsendes Problem med christofides algoritme.
     Finder et minimum udspændende træ.
@@ -1541,6 +2213,7 @@ def christofides(V,E):
     Input
     V -> en liste af punkter
     E -> en liste af vægtet kanter
+    vægte -> et vægt-indeks fra weight_index, som dannes ud fra E hvis det ikke er givet
 
     Output
     H -> punktsekvensen af Hamiltonkredsen med mindst vægt fundet
@@ -1551,6 +2224,9 @@ def christofides(V,E):
     (['1', '2', '4', '3', '1'], 28)
     """
     
+    if vægte is None: #Danner vægt-indekset, så vægten af en kant findes uden at gennemsøge E
+        vægte = weight_index(E)
+    
     VT, ET = prims(V, E) #Finder det minimum udspændende træ
     T = make_graph(VT, ET)
     
@@ -1560,7 +2236,7 @@ def christofides(V,E):
         if deg[v]%2 == 1:
             odd_deg += [v]
             
-    M, W = min_perfect_matching(odd_deg, E) #Minimum perfekt matching
+    M, W = min_perfect_matching(odd_deg, E, vægte) #Minimum perfekt matching
     
     E_dob = [] #Træet og matchingen uden vægte
     for e in ET+M:
@@ -1580,9 +2256,7 @@ def christofides(V,E):
     
     hamilton = [] #Danner Hamiltonkredsen med vægte
     for u, v in cut_edge:
-        for e in E:
-            if u in e and v in e:
-                hamilton.append(e)
+        hamilton.append([u, v, vægte[u,v]])
   
     length = 0 #Udregner længden af Hamiltonkredsen
     for e in hamilton:
@@ -1602,15 +2276,18 @@ def christofides(V,E):
     return H, length #Returnerer Hamiltonkredsen og længden af den
 
 
-def opt2(V,E):
+def opt2(V,E,vægte=None,kandidater=False):
     """
     Finder en Hamiltonkreds ved at tage punkterne i rækkefølge.
     Forbedre Hamiltonkredsen ved at sammenligne kanter i kredsen med alternative kanter.
     Sammenligner 2 par kanter adgangen.
+    Er kandidater True, så er E en kandidatgraf, og opt2_kandidater bruges i stedet.
 
     Input
     V -> en liste af punkter
     E -> en liste af vægtet kanter
+    vægte -> et vægt-indeks fra weight_index, som dannes ud fra E hvis det ikke er givet. Skal gives, hvis kandidater er True
+    kandidater -> om E er en kandidatgraf, f.eks. fra candidate_edges
 
     Output
     h -> punktsekvensen af Hamiltonkredsen med mindst vægt fundet
@@ -1621,49 +2298,131 @@ def opt2(V,E):
     (['1', '4', '3', '2', '1'], 28)
     """
     
-    h = V+[V[0]] #Danner en Hamiltonkreds
+    if kandidater: #E er en kandidatgraf og ikke en komplet graf
+        return opt2_kandidater(V,E,vægte)
+    
+    if vægte is None: #Danner vægt-indekset, så vægten af en kant findes uden at gennemsøge E
+        vægte = weight_index(E)
+    
+    h = array('i', range(len(V))) #Danner en Hamiltonkreds af heltal
+    h.append(0)
     
     k = 0 #Antal gennemgange uden forbedringer
     
     while k < len(V)-2: #Stopper, når der ikke har været flere forbedringer. De to sidste kanter gør igen forskel
     
-        u1, u2 = h[k:k+2] #Finder den nedre kanten som skal sammenlignes
-        for e in E:
-            if u1 in e and u2 in e:
-                w_u = e[2] #Gemmer vægten
-                break
+        u1, u2 = V[h[k]], V[h[k+1]] #Finder den nedre kanten som skal sammenlignes og gemmer vægten
+        w_u = vægte[u1,u2]
         
         for i in range(k+2,len(V)): #Sammenligner den nedre kant i kredsen med en øvre kant
-            v1, v2 = h[i:i+2]
-            for e in E:
-                if v1 in e and v2 in e: #Finder den øvre kant
-                    w_v = e[2] #Gemmer vægten
-                    
-                elif u1 in e and v1 in e: #Finder de alternative kanter og gemmer deres vægt
-                    w_uv1 = e[2]
-                elif u2 in e and v2 in e:
-                    w_uv2 = e[2]
+            v1, v2 = V[h[i]], V[h[i+1]]
+            w_v = vægte[v1,v2] #Finder den øvre kant og gemmer vægten
+            if v2 != u1: #Finder de alternative kanter og gemmer deres vægt. Er v2 startpunktet, så er u1-v1 den øvre kant og den forrige vægt beholdes
+                w_uv1 = vægte[u1,v1]
+            w_uv2 = vægte[u2,v2]
             
             if w_u + w_v > w_uv1 + w_uv2: #De to alternative kanter giver en forbedring
                 Rh = h[k+1:i+1]
                 Rh.reverse()
-                h = h[:k+1] + Rh + h[i+1:] #Opdaterer Hamiltonkredsen
+                h[k+1:i+1] = Rh #Opdaterer Hamiltonkredsen
                 k -= 1
                 break
         k += 1
         
+    h = [V[i] for i in h]
     W = 0
     for i in range(len(V)): #Udregner vægten af Hamiltonkredsen
-        u, v = h[i:i+2]
-        for e in E:
-            if u in e and v in e:
-                W += e[2]
-                break
+        W += vægte[h[i],h[i+1]]
+    
+    return h, W #Returnerer Hamiltonkredsen og vægten af den
+
+
+def opt2_kandidater(V,E,vægte):
+    """
+    2opt metoden på en kandidatgraf, f.eks. fra candidate_edges, hvor kun de korteste kanter fra hvert punkt er med.
+    Starter i Hamiltonkredsen fra nærmest_nabo med start i V[0].
+    For hver kant u1-u2 i kredsen prøves kun de alternative kanter u1-v1, hvor v1 er en nabo til u1 i E, og u1-v1 er kortere end u1-u2.
+    Derfor bruger en gennemgang af kredsen O(n k) tid i stedet for O(n^2), hvor k er antallet af naboer.
+    Vægten af kanter, som ikke er i E, findes i vægte, så vægte skal være et vægt-indeks for den komplette graf, f.eks. en EuclideanGraph.
+    Kan der ikke dannes en Hamiltonkreds at starte i ud fra E og vægte, så gives en ValueError.
+
+    Input
+    V -> en liste af punkter
+    E -> en liste af vægtet kanter i kandidatgrafen
+    vægte -> et vægt-indeks for den komplette graf
+
+    Output
+    h -> punktsekvensen af Hamiltonkredsen med mindst vægt fundet
+    W -> den samlede vægt i Hamiltonkredsen med mindst vægt fundet
+    
+    Eksempel
+    >>> G = EuclideanGraph([[0,0],[0,1],[1,1],[1,0],[2,0],[2,1]])
+    >>> opt2_kandidater(G.vertices,candidate_edges(G,2),G)
+    (['0', '1', '2', '5', '4', '3', '0'], 6.0)
+    >>> opt2(G.vertices,candidate_edges(G,2),kandidater=True)
+    Traceback (most recent call last):
+    ...
+    ValueError: opt2_kandidater skal have vægte for den komplette graf
+    """
+    
+    if vægte is None:
+        raise ValueError('opt2_kandidater skal have vægte for den komplette graf')
+    
+    n = len(V)
+    idx = vertex_index(V) #Omdanner punkterne og kanterne til heltal
+    U, Y, W = index_edges(idx, E)
+    adj = index_adjacency(n, U, Y)
+    naboer = [sorted((W[m], Y[m] if U[m] == u else U[m]) for m in adj[u]) for u in range(n)] #Naboerne til hvert punkt efter vægt
+    
+    if isinstance(vægte, EuclideanGraph): #Vægten mellem to punkter givet ved heltal
+        ids = [vægte.index[v] for v in V]
+        vægt = lambda a, b: vægte.distance(ids[a], ids[b])
+    else:
+        vægt = lambda a, b: vægte[V[a],V[b]]
+    
+    try: #Starter i Hamiltonkredsen som heltal, hvor h[i] er punktet på plads i og pos[v] er pladsen for punktet v
+        H, W = nærmest_nabo(V,E,vægte,[V[0]])
+    except KeyError as fejl: #Kanten, som lukker kredsen, er ikke i vægte
+        raise ValueError(f'Kanten {fejl} mangler i vægte, så der kan ikke dannes en Hamiltonkreds') from fejl
+    h = np.array([idx[v] for v in H[:-1]])
+    pos = np.empty(n, dtype=np.int64)
+    pos[h] = np.arange(n)
+    
+    forbedret = True
+    while forbedret: #Gennemgår kredsen, indtil der ikke er flere forbedringer
+        forbedret = False
+        for k in range(n):
+            for retning in (1, -1): #Kanten fra u1 til den næste og til den forrige i kredsen
+                u1 = int(h[k])
+                i = (k + retning) % n
+                u2 = int(h[i])
+                w_u = vægt(u1,u2)
+                
+                for w_uv1, v1 in naboer[u1]: #Sammenligner kanten u1-u2 med kanterne u1-v1 i kandidatgrafen
+                    if w_uv1 >= w_u: #Kun kortere kanter kan give en forbedring
+                        break
+                    j = int(pos[v1])
+                    v2 = int(h[(j + retning) % n])
+                    if v1 == u2 or v2 == u1:
+                        continue
+                    
+                    if w_u + vægt(v1,v2) > w_uv1 + vægt(u2,v2): #De to alternative kanter giver en forbedring
+                        a, b = (k, j) if retning == 1 else (i, (j - 1) % n)
+                        a, b = min(a,b), max(a,b) #Kanterne der slettes er h[a]-h[a+1] og h[b]-h[b+1], så h[a+1:b+1] vendes
+                        h[a+1:b+1] = h[a+1:b+1][::-1].copy()
+                        pos[h[a+1:b+1]] = np.arange(a+1,b+1)
+                        forbedret = True
+                        break
+    
+    h = [V[i] for i in h.tolist()] + [V[h[0]]]
+    W = 0
+    for i in range(n): #Udregner vægten af Hamiltonkredsen
+        W += vægte[h[i],h[i+1]]
     
     return h, W #Returnerer Hamiltonkredsen og vægten af den
 
 
-def hungarian(V,E):
+def hungarian(V,E,vægte=None):
     """
     Finder løsningen til Den Handelsrejsendes problem med 'the hungarian method'.
     Finder en kant i vægtmatricen som har lav vægt og hvor punkterne er incident med høj vægtet kanter.
@@ -1671,6 +2430,7 @@ def hungarian(V,E):
     Input
     V -> en liste af punkter
     E -> en liste af vægtet kanter
+    vægte -> et vægt-indeks fra weight_index, som dannes ud fra E hvis det ikke er givet
 
     Output
     H -> punktsekvensen af Hamiltonkredsen med mindst vægt fundet
@@ -1681,6 +2441,9 @@ def hungarian(V,E):
     (['1', '2', '3', '4', '1'], 28)
     """
     
+    if vægte is None: #Danner vægt-indekset, så vægten af en kant findes uden at gennemsøge E
+        vægte = weight_index(E)
+    
     infty = 999999999999 #Sætter uendelige til et enormt stort tal
     
     M = []
@@ -1688,10 +2451,7 @@ def hungarian(V,E):
         M.append([])
         for j in range(len(V)):
             if j != i:
-                for e in E:
-                    if V[i] in e and V[j] in e:
-                        M[i].append(round(e[2]))
-                        break
+                M[i].append(round(vægte[V[i],V[j]]))
             else:
                 M[i].append('X') #Hvis de to punkter i kanten er ens, så eksisterer kanten ikke
     
@@ -1802,10 +2562,7 @@ def hungarian(V,E):
                         
     W = 0
     for u,v in S: #Udregner vægten af alle kanterne
-        for e in E:
-            if u in e and v in e:
-                W += e[2]
-                break
+        W += vægte[u,v]
     
     H, incl = [V[0]], []
     while len(H) < len(V)+1: #Danner en punktssekvens for Hamiltonkredsen
@@ -1827,7 +2584,7 @@ Original algoritme (fra Mikkel)
 """
 
 
-def my_algorithm(V,E):
+def my_algorithm(V,E,vægte=None):
     """
     Finder løsningen til Den Handelsrejsendes problem med en originalt formuleret algoritme.
     Danner maximale minimum vægtet matching.
@@ -1839,6 +2596,7 @@ def my_algorithm(V,E):
     Input
     V -> en liste af punkter
     E -> en liste af vægtet kanter
+    vægte -> et vægt-indeks fra weight_index, som dannes ud fra E hvis det ikke er givet
 
     Output
     H -> punktsekvensen af Hamiltonkredsen med mindst vægt fundet
@@ -1849,11 +2607,14 @@ def my_algorithm(V,E):
     (['1', '2', '4', '3', '1'], 28)
     """
 
-    M = min_maximal_matching(V,E) #Laver den første maximale minimum matching
+    if vægte is None: #Danner vægt-indekset, så vægten af en kant findes uden at gennemsøge E
+        vægte = weight_index(E)
+    
+    M = min_maximal_matching(V,E,vægte) #Laver den første maximale minimum matching
     
     Ef = []
     for e in M: #Tilføjer kanterne i matchingen til skoven
-        Ef.append(e[:2])
+        Ef.append(list(e[:2]))
     
     F = make_graph(V,Ef) #Danner skoven
     deg_f = degree(F) #Danner grad ordbog til skoven
@@ -1882,9 +2643,9 @@ def my_algorithm(V,E):
         
     while len(Vm) > 2: #Fortsætter indtil en Hamiltonsti er dannet
         Em = []
-        for e in E: #Finder alle kanter i delgrafen med punkter af lav grad
+        for e in E: #Finder alle kanter i delgrafen med punkter af lav grad. Kanterne er tupler, som erstattes i stedet for at blive ændret
             if e[0] in Vm and e[1] in Vm:
-                Em.append(e[:])
+                Em.append(tuple(e))
         
         Vm2 = [] #Punkterne efter edge contractions
         nye_punkter, incl = dict(), [] #Setup til at lave edge contractions
@@ -1908,43 +2669,24 @@ def my_algorithm(V,E):
             if v not in incl:
                 Vm2.append(v)
        
-        edge_con, Emremove = dict(), [] #Setup
+        edge_con, Emremove = dict(), [] #Setup. edge_con tager en ny kant tilbage til den originale kant
         for w in nye_punkter: #For hver edge contraction
             u, v = nye_punkter[w]
-            for e in Em:
+            for m in range(len(Em)):
+                e = Em[m]
                 if u in e and v in e:
                     Emremove.append(e) #Slet kanter mellem punkter, der er blevet til et fælles punkt
                 
                 if u in e and v not in e: #Kanten indeholder et punkt fra edge contraction
-                    e0 = e[:]
-                    if e[0] == u:
-                        e0[0] = w
-                    if e[1] == u:
-                        e0[1] = w
-                    if str(e) in edge_con: #Tilføjer en key til en ordbog, som tager den nye kant tilbage til den originale kant
-                        edge_con[str(e0)] = edge_con[str(e)]
-                    else:    
-                        edge_con[str(e0)] = e[:]
-                    if e[0] == u:
-                        e[0] = w
-                    if e[1] == u:
-                        e[1] = w
-                    
+                    x = u
+                elif u not in e and v in e:
+                    x = v
+                else:
+                    continue
                 
-                if u not in e and v in e: #Kanten indeholder et punkt fra edge contraction
-                    e0 = e[:]
-                    if e[0] == v:
-                        e0[0] = w
-                    if e[1] == v:
-                        e0[1] = w
-                    if str(e) in edge_con: #Tilføjer en key til en ordbog, som tager den nye kant tilbage til den originale kant
-                        edge_con[str(e0)] = edge_con[str(e)]
-                    else:    
-                        edge_con[str(e0)] = e[:]
-                    if e[0] == v:
-                        e[0] = w
-                    if e[1] == v:
-                        e[1] = w
+                e0 = (w if e[0] == x else e[0], w if e[1] == x else e[1]) + e[2:] #Kanten efter edge contraction
+                edge_con[e0] = edge_con.get(e, e) #En kant fra en tidligere edge contraction føres tilbage til den originale kant
+                Em[m] = e0
                 
         for e in Emremove: #Sletter de kanter der skal slettes
             Em.remove(e)
@@ -1954,12 +2696,11 @@ def my_algorithm(V,E):
         M = min_maximal_matching(Vm2,Em2) #Finder maximal minimum matching i delgrafen efter edge contractions
         
         for e0 in M: #For hver kant i matchingen
-            if str(e0) in edge_con: #Find den originale kant
-                e = edge_con[str(e0)]
+            if tuple(e0) in edge_con: #Find den originale kant
+                e = edge_con[tuple(e0)]
             else:
-                e1 = [e0[1],e0[0],e0[2]]
-                e = edge_con[str(e1)]
-            Ef.append(e[:2]) #Tilføjer den originale kant til skoven
+                e = edge_con[e0[1],e0[0],e0[2]]
+            Ef.append(list(e[:2])) #Tilføjer den originale kant til skoven
             u, v = e[:2] #Puntkerne i kanten
             
             for k in komponents: #Finder komponenterne som punkterne er i
@@ -1988,10 +2729,7 @@ def my_algorithm(V,E):
     W = 0
     for ef in Ef: #Finder vægten af Hamiltonkredsen
         u, v = ef
-        for e in E:
-            if u in e and v in e:
-                W += e[2]
-                break
+        W += vægte[u,v]
     
     H, incl = [V[0]], []
     while len(H) < len(V)+1: #Danner en punktssekvens for Hamiltonkredsen
@@ -2007,11 +2745,14 @@ def my_algorithm(V,E):
     return H, W #Returnerer Hamiltonkredsen og vægten af den
 
 
-def prims_mod(V,E):
+def prims_mod(V,E,vægte=None):
     """
     Modificeret prim
     """
     
+    if vægte is None: #Danner vægt-indekset, så vægten af en kant findes uden at gennemsøge E
+        vægte = weight_index(E)
+    
     infty = 100000000 #Uendelige sat som et enormt stort tal
     
     E1 = E[:]
@@ -2053,10 +2794,8 @@ def prims_mod(V,E):
         if deg[v] == 1:
             e.append(v)
     
-    u, v = e[:2]
-    for e in E1:
-        if u in e and v in e:
-            ET.append(e)
+    u, v = e[:2] #Lukker Hamiltonstien med kanten mellem de to punkter af grad 1
+    ET.append([u, v, vægte[u,v]])
     
     W = 0
     for et in ET: #Finder vægten af Hamiltonkredsen
@@ -2076,11 +2815,14 @@ def prims_mod(V,E):
     return H, W #Returnerer Hamiltonkredsen og vægten af den
         
 
-def kruskals_mod(V,E):
+def kruskals_mod(V,E,vægte=None):
     """
     Modificeret kruskal
     """
     
+    if vægte is None: #Danner vægt-indekset, så vægten af en kant findes uden at gennemsøge E
+        vægte = weight_index(E)
+    
     infty = 100000000 #Uendelige sat som et enormt stort tal
     
     E1 = E[:]
@@ -2144,10 +2886,8 @@ def kruskals_mod(V,E):
         if deg[v] == 1:
             e.append(v)
     
-    u, v = e[:2]
-    for e in E1:
-        if u in e and v in e:
-            ET.append(e)
+    u, v = e[:2] #Lukker Hamiltonstien med kanten mellem de to punkter af grad 1
+    ET.append([u, v, vægte[u,v]])
     
     W = 0
     for et in ET: #Finder vægten af Hamiltonkredsen
@@ -2167,11 +2907,14 @@ def kruskals_mod(V,E):
     return H, W #Returnerer Hamiltonkredsen og vægten af den
 
 
-def boruvkas_mod(V,E):
+def boruvkas_mod(V,E,vægte=None):
     """
     Modificeret kruskal
     """
     
+    if vægte is None: #Danner vægt-indekset, så vægten af en kant findes uden at gennemsøge E
+        vægte = weight_index(E)
+    
     infty = 100000000 #Uendelige sat som et enormt stort tal
     
     E1 = E[:]
@@ -2285,10 +3028,8 @@ def boruvkas_mod(V,E):
         if deg[v] == 1:
             e.append(v)
     
-    u, v = e[:2]
-    for e in E1:
-        if u in e and v in e:
-            ET.append(e)
+    u, v = e[:2] #Lukker Hamiltonstien med kanten mellem de to punkter af grad 1
+    ET.append([u, v, vægte[u,v]])
     
     W = 0
     for et in ET: #Finder vægten af Hamiltonkredsen
@@ -2325,8 +3066,8 @@ def ant_optimization(V,E,n):
     
     Input
     V -> en liste af punkter
-    E -> en liste af vægtet kanter
-    n -> en
+    E -> en liste af vægtet kanter eller en EuclideanGraph
+    n -> antallet af myre, der simuleres
 
     Output
     hv -> punktsekvensen af Hamiltonkredsen med mindst vægt
@@ -2335,69 +3076,68 @@ def ant_optimization(V,E,n):
     Eksempel
     >>> ant_optimization(['1','2','3','4'],[['1','2',5],['1','3',7],['1','4',9],['2','3',8],['2','4',10],['3','4',6]],1000)
     (['1', '2', '3', '4', '1'], 28)
+    >>> ant_optimization(['2','0','3','1'],EuclideanGraph([[0,0],[3,0],[3,4],[0,4],[9,9]]),50)
+    (['2', '3', '0', '1', '2'], 14.0)
     """
     
-    kant_nabo = dict()
-    for v in V: #Danner en ordbog med alle kanter incident på et bestemt punkt
-        nabo = []
+    idx = vertex_index(V) #Omdanner punkterne til heltal
+    vægte = weight_index(E)
+    
+    if isinstance(E, EuclideanGraph): #Kanterne incident med et punkt dannes først, når de skal bruges
+        kant_nabo = None
+        ids = [E.index[v] for v in V] #Punkternes heltal i den Euklidiske graf, som ikke behøver at have samme rækkefølge som V
+    else:
+        kant_nabo = [[] for v in V] #Danner en liste med alle kanter incident på hvert punkt som (nabo, vægt), i samme rækkefølge som i E
         for e in E:
-            if v in e:
-                nabo.append(e)
-        kant_nabo[v] = nabo
+            u, v = idx[e[0]], idx[e[1]]
+            kant_nabo[u].append((v, e[2]))
+            if u != v:
+                kant_nabo[v].append((u, e[2]))
+    
+    def mulige_naboer(u, besøgt): #Danner en liste af alle mulige kanter som kan vælges, når man er i punktet u, som (nabo, vægt)
+        if kant_nabo is None:
+            afstand = E.row(ids[u])[ids].tolist()
+            return [(v, afstand[v]) for v in range(len(V)) if besøgt[v] == False]
+        return [(v, w) for v, w in kant_nabo[u] if besøgt[v] == False]
     
-    feromoner = dict()
-    for e in E: #Danner en ordbog med feromon niveauet per kant
-        feromoner[str(e)] = 1
+    feromoner = dict() #Feromon niveauet per kant, hvor en kant er nøglen (u,v) med u < v. Kanter uden feromon har niveauet 1
     
     for i in range(n): #Simuleringerne af n myre
-        v0 = npr.choice(V) #Startpunkt
+        v0 = idx[npr.choice(V)] #Startpunkt
         hv, he, l = [v0], [], 0 #Hamiltonkredsen i punkter, kanter og vægt
+        besøgt = [False for v in V]
+        besøgt[v0] = True
         
         while len(hv) < len(V): #Danner en Hamiltonsti
             
-            mulig_nabo, P = [], [] #Danner en liste af alle mulige kanter som kan vælges, når man er i et punkt og udregner sandsynligheden
-            for e in kant_nabo[hv[-1]]:
-                if e[0] != hv[-1] and e[0] not in hv:
-                    mulig_nabo.append(e)
-                    P.append(feromoner[str(e)]*(1/e[2]))
-                elif e[1] != hv[-1] and e[1] not in hv:
-                    mulig_nabo.append(e)
-                    P.append(feromoner[str(e)]*(1/e[2]))
+            mulig_nabo = mulige_naboer(hv[-1], besøgt) #Udregner sandsynligheden for hver mulig kant
+            P = [feromoner.get((min(hv[-1],v),max(hv[-1],v)),1)*(1/w) for v, w in mulig_nabo]
             
             P = P / np.sum(P) #Danner sandsynligheder i decimaltal
             i = npr.choice(np.arange(len(mulig_nabo)), p=P) #Vælger en kant
-            e0 = mulig_nabo[i]
+            v, w = mulig_nabo[i]
             
-            if e0[0] != hv[-1]: #Tilføjer næste punkt til stien
-                hv.append(e0[0])
-            elif e0[1] != hv[-1]:
-                hv.append(e0[1])
-            he.append(e0) #Tilføjer næste kant til stien
-            l += e0[2] #Tilføjer vægten
+            he.append((min(hv[-1],v),max(hv[-1],v))) #Tilføjer næste kant til stien
+            hv.append(v) #Tilføjer næste punkt til stien
+            besøgt[v] = True
+            l += w #Tilføjer vægten
             
-        for e in kant_nabo[v0]: #Tilføjer det sidste punkt/kant/vægt
-            if hv[-1] in e:
-                hv.append(v0)
-                he.append(e)
-                l += e[2]
-                break
+        he.append((min(hv[-1],v0),max(hv[-1],v0))) #Tilføjer det sidste punkt/kant/vægt
+        l += vægte[V[hv[-1]],V[v0]]
+        hv.append(v0)
         
         for e in he: #Opdaterer feromon niveauet for alle kanterne i Hamiltonkredsen
-            feromoner[str(e)] = feromoner.get(str(e)) + 1/l
+            feromoner[e] = feromoner.get(e,1) + 1/l
     
-    v0 = V[0] #Starter den sidste Hamiltonkreds
+    v0 = 0 #Starter den sidste Hamiltonkreds i V[0]
     hv, l = [v0], 0
+    besøgt = [False for v in V]
+    besøgt[v0] = True
     
     while len(hv) < len(V): #Danner den sidste Hamiltonsti
         
-        mulig_nabo, P = [], [] #Danner en liste af alle mulige kanter som kan vælges, når man er i et punkt og udregner sandsynligheden
-        for e in kant_nabo[hv[-1]]:
-            if e[0] != hv[-1] and e[0] not in hv:
-                mulig_nabo.append(e)
-                P.append(feromoner[str(e)]*(1/e[2]))
-            elif e[1] != hv[-1] and e[1] not in hv:
-                mulig_nabo.append(e)
-                P.append(feromoner[str(e)]*(1/e[2]))
+        mulig_nabo = mulige_naboer(hv[-1], besøgt) #Udregner sandsynligheden for hver mulig kant
+        P = [feromoner.get((min(hv[-1],v),max(hv[-1],v)),1)*(1/w) for v, w in mulig_nabo]
         
         P = P / np.sum(P) #Danner sandsynligheder i decimaltal
         p0 = 0
@@ -2405,19 +3145,14 @@ def ant_optimization(V,E,n):
             if P[i] > p0:
                 p0, k = P[i], i
                 
-        e0 = mulig_nabo[k] #Kanten der tilføjes
-        
-        if e0[0] != hv[-1]: #Tilføjer punkt
-            hv.append(e0[0])
-        elif e0[1] != hv[-1]:
-            hv.append(e0[1])
-        l += e0[2] #Tilføjer vægt
-        
-    for e in kant_nabo[v0]: #Tilføjer sidste punkt og vægt
-        if hv[-1] in e:
-            hv.append(v0)
-            l += e[2]
-            break
+        v, w = mulig_nabo[k] #Kanten der tilføjes
+        hv.append(v) #Tilføjer punkt
+        besøgt[v] = True
+        l += w #Tilføjer vægt
+        
+    l += vægte[V[hv[-1]],V[v0]] #Tilføjer sidste punkt og vægt
+    hv.append(v0)
+    hv = [V[v] for v in hv]
     
     return hv, l #Returnerer Hamiltonkreds og vægten af den
 
@@ -2579,17 +3314,18 @@ import matplotlib.pyplot as plt
 plt.style.use('seaborn')
 
 
-def euklidisk(n):
+def euklidisk(n, implicit=False):
     """
     Danner en komplet vægtet graf med n punkter.
     Vægten af kanterne er afstanden mellem punkterne i Euklidisk rum.
     
     Input
     n -> antallet af punkter
+    implicit -> hvis True, så dannes kanterne ikke. I stedet gives en EuclideanGraph, som kun gemmer koordinaterne
 
     Output
     V -> en liste af punkter
-    E -> en liste af vægtet kanter, hvor vægten er afstanden mellem punkterne
+    E -> en liste af vægtet kanter, hvor vægten er afstanden mellem punkterne, eller en EuclideanGraph
     points -> en ordbog, der tager et punkt over til dens koordinater
     
     Eksempel
@@ -2601,6 +3337,9 @@ def euklidisk(n):
     for i in range(n): #Danner punktlisten og koordinat ordbog
         V.append(str(i))
         points[V[-1]] = [10*r.random(),10*r.random()]
+    
+    if implicit: #Afstandene udregnes først, når de skal bruges
+        return V, EuclideanGraph([points[v] for v in V], V), points
         
     E = []
     for i in range(n-1): #Udregner afstand mellem punkter og danner kantlisten
@@ -2613,6 +3352,29 @@ def euklidisk(n):
     return V, E, points
 
 
+def candidate_edges(G, k=10):
+    """
+    Danner en kandidatgraf for en Euklidisk graf, hvor hvert punkt kun har kanter til sine k nærmeste naboer.
+    Næsten alle kanter i et minimum udspændende træ eller en kort Hamiltonkreds går mellem nære punkter,
+    så prims, kruskals, nærmest_nabo og opt2 kan køre på kandidatgrafen med O(n k) kanter i stedet for alle n(n-1)/2 kanter.
+    nærmest_nabo og opt2 skal have den Euklidiske graf som vægte, da de også bruger kanter, som ikke er i kandidatgrafen, og opt2 skal kaldes med kandidater=True.
+    De nærmeste naboer findes ved at dele planen op i et gitter, se EuclideanGraph.nearest_neighbours i graph_theory.
+    
+    Input
+    G -> en EuclideanGraph, f.eks. fra euklidisk(n, implicit=True)
+    k -> antallet af nærmeste naboer for hvert punkt
+    
+    Output
+    E -> en liste af vægtet kanter
+    
+    Eksempel
+    >>> candidate_edges(EuclideanGraph([[0,0],[3,4],[3,0],[10,0]]),1)
+    [['0', '2', 3.0], ['1', '2', 4.0], ['2', '3', 7.0]]
+    """
+    
+    return G.candidate_edges(k)
+
+
 def den_handelsrejsendes_problem(n):
     """
     Funktionen tager et antal punkter, hvor der så dannes en Euklidisk graf med det antal punkter.
@@ -2740,8 +3502,8 @@ def den_handelsrejsendes_problem(n):
 def kortest_sti(n):
     """
     Funktionen tager et antal punkter, hvor der så dannes en Euklidisk graf med det antal punkter.
-    Derefter anvendes to kortest sti algoritmer på grafen.
-    Til sidst dannes en figur, som viser de to dannede stier.
+    Derefter anvendes tre kortest sti algoritmer på grafen.
+    Til sidst dannes en figur, som viser de tre dannede stier, og hvor mange punkter A* algoritmen udvidede.
     """
     
     V, E, points = euklidisk(n) #Danner en Euklidisk graf
@@ -2770,10 +3532,16 @@ def kortest_sti(n):
         vx, vy = points[v]
         x_gr.append(vx); y_gr.append(vy)
     
-    fig, axs = plt.subplots(1, 2, figsize=(6, 3), dpi=500) #Danner figuren
+    S_as, w_as, udvidet = a_stjerne(V, E, V[0], V[-1], points) #Anvender A* algoritmen med den lige afstand som estimat
+    x_as, y_as = [], []
+    for v in S_as: #Finder rækkefølgen af punkternes koordinater i stien fra A* algoritmen
+        vx, vy = points[v]
+        x_as.append(vx); y_as.append(vy)
+    
+    fig, axs = plt.subplots(1, 3, figsize=(9, 3), dpi=500) #Danner figuren
     #fig.suptitle('Kortest sti')
     
-    (ax1, ax2) = axs
+    (ax1, ax2, ax3) = axs
     for e in E: #Plotter Dijkstras algoritme
         x, y = [], []
         for v in e[:2]:
@@ -2795,6 +3563,17 @@ def kortest_sti(n):
     ax2.set_xticks([])
     ax2.set_yticks([])
     ax2.set_title('Grådig algoritme '+str(round(w_gr,2)), fontsize=12)
+    
+    for e in E: #Plotter A* algoritmen
+        x, y = [], []
+        for v in e[:2]:
+            vx, vy = points[v]
+            x.append(vx); y.append(vy)
+        ax3.plot(x, y, 'o-', color='darkgrey', linewidth=0.5)
+    ax3.plot(x_as, y_as, 'o-', color='navy', linewidth=1)
+    ax3.set_xticks([])
+    ax3.set_yticks([])
+    ax3.set_title('A* algoritme '+str(round(w_as,2))+' ('+str(udvidet)+' af '+str(n)+')', fontsize=12)
 
 
 def minimum_udspændende_træer(n):
@@ -3,67 +3,1254 @@ Graph theory algorithms implemented in python
 
 A graph is represented by a set of vertices and a list of edges. Each edge is a tuple with a start vertex, end vertex,
 and possibly a weight. The algorithms are only guaranteed to work for positively weighted graphs.
+
+The Graph class keeps the graph in compressed sparse row form, so the neighbours of a vertex are found in O(1) time
+instead of by scanning the list of edges.
 """
 
-from typing import Set, List, Tuple, Any, Hashable
+import hashlib
+import heapq
+import os
+import sys
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.sharedctypes import RawArray
+from typing import Set, List, Tuple, Any, Hashable, Iterable, NamedTuple, Callable
+
+import numpy as np
 
 inf = float('inf')
 
+
+class Edge(NamedTuple):
+    """
+    An immutable weighted edge from u to v.
+
+    An Edge is a tuple without a per-instance dictionary, so it takes less memory than the list [u, v, w] and can be
+    shared between graphs without being copied. It is indexed like the list form, e[0], e[1] and e[2], and hashes by
+    its value. Unweighted edges get the weight 1.
+    """
+    u: Hashable
+    v: Hashable
+    w: int | float = 1
+
+
 class Graph:
+    """
+    A graph stored in compressed sparse row (CSR) form.
+
+    Vertices are mapped to integer ids 0, ..., n - 1 in the order they are added. The neighbours of the vertex with
+    id i are indices[indptr[i]:indptr[i + 1]] and the weights of the corresponding edges are
+    weights[indptr[i]:indptr[i + 1]]. Undirected edges are stored in both directions, so a loop counts twice towards
+    the degree of its vertex. Unweighted graphs get the weight 1 on every edge.
+
+    The edges are kept as three parallel arrays (tails, heads and weights) and the CSR arrays are rebuilt lazily the
+    first time they are needed after the graph has been changed. Every change also increases version, so results
+    computed for the graph can be recognised as out of date.
+    """
 
     def __init__(self, vertices: Set[Hashable] | List[Hashable] | Tuple[Hashable],
                  edges: List[Tuple[Any, Any] | Tuple[Any, Any, int | float]],
                  directed: bool = False):
-        self.vertices = set(vertices)
-        self.edges = list(edges)
+        self.vertices = []
+        self.index = {}
         self.directed = directed
+        self.weighted = all(len(e) == 3 for e in edges)
 
-        if all(len(e) == 3 for e in self.edges):
-            self.weighted = True
-        else:
+        self._tails = np.empty(0, dtype=np.int64)
+        self._heads = np.empty(0, dtype=np.int64)
+        self._weights = np.empty(0, dtype=np.float64)
+        self._csr = None
+        self.version = 0
+        self._fingerprint = None
+
+        self.add_vertices(vertices)
+        self.add_edges(edges)
+
+    def __len__(self) -> int:
+        return len(self.vertices)
+
+    @property
+    def number_of_edges(self) -> int:
+        return len(self._tails)
+
+    @property
+    def edges(self) -> List[Tuple[Any, Any] | Tuple[Any, Any, int | float]]:
+        """
+        The edges as a list of tuples of vertices, with the weight as third element for weighted graphs.
+        """
+        tails = [self.vertices[i] for i in self._tails.tolist()]
+        heads = [self.vertices[i] for i in self._heads.tolist()]
+        if self.weighted:
+            return list(zip(tails, heads, self._weights.tolist()))
+        return list(zip(tails, heads))
+
+    def add_vertex(self, vertex: Hashable) -> int:
+        """
+        Add a vertex to the graph if it is not already there and return its id.
+        """
+        if vertex not in self.index:
+            self.index[vertex] = len(self.vertices)
+            self.vertices.append(vertex)
+            self._csr = None
+            self.version += 1
+        return self.index[vertex]
+
+    def add_vertices(self, vertices: Iterable[Hashable]):
+        for vertex in vertices:
+            self.add_vertex(vertex)
+
+    def add_edge(self, u: Hashable, v: Hashable, weight: int | float = 1):
+        self.add_edges([(u, v, weight)])
+
+    def add_edges(self, edges: List[Tuple[Any, Any] | Tuple[Any, Any, int | float]]):
+        """
+        Add edges given as tuples (u, v) or (u, v, weight). Vertices not in the graph are added.
+        """
+        if len(edges) == 0:
+            return
+        tails = np.fromiter((self.add_vertex(e[0]) for e in edges), dtype=np.int64, count=len(edges))
+        heads = np.fromiter((self.add_vertex(e[1]) for e in edges), dtype=np.int64, count=len(edges))
+        weights = np.fromiter((e[2] if len(e) == 3 else 1 for e in edges), dtype=np.float64, count=len(edges))
+        if not all(len(e) == 3 for e in edges):
             self.weighted = False
 
-    def add_vertex(self, vertex: Hashable):
-        self.vertices.add(vertex)
+        self._tails = np.concatenate((self._tails, tails))
+        self._heads = np.concatenate((self._heads, heads))
+        self._weights = np.concatenate((self._weights, weights))
+        self._csr = None
+        self.version += 1
 
-    def add_vertices(self, vertices: Set[Hashable] | List[Hashable] | Tuple[Hashable]):
-        self.vertices.union(set(vertices))
+    def add_weights(self, weights: List[int | float] | np.ndarray):
+        """
+        Give the edges weights, in the order the edges were added.
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.shape != self._tails.shape:
+            raise ValueError(f'Expected {len(self._tails)} weights, got {len(weights)}')
 
-    def add_vertex(self, vertex: Hashable):
-        self.vertices.add(vertex)
+        self._weights = weights.copy()
+        self.weighted = True
+        self._csr = None
+        self.version += 1
 
-    def add_vertices(self, vertices: Set[Hashable] | List[Hashable] | Tuple[Hashable]):
-        self.vertices.union(set(vertices))
+    def _edge_mask(self, u: Hashable, v: Hashable) -> np.ndarray:
+        # The edges from u to v, and from v to u for undirected graphs
+        i, j = self.index[u], self.index[v]
+        mask = (self._tails == i) & (self._heads == j)
+        if not self.directed:
+            mask |= (self._tails == j) & (self._heads == i)
+        if not mask.any():
+            raise KeyError((u, v))
+        return mask
 
-    def add_weights(self, ):
+    def weight(self, u: Hashable, v: Hashable) -> int | float:
+        """
+        The weight of the edge between u and v, the lowest if there are parallel edges.
+        """
+        return self._weights[self._edge_mask(u, v)].min().item()
 
+    def set_weight(self, u: Hashable, v: Hashable, weight: int | float):
+        """
+        Give every edge between u and v the weight.
+        """
+        self._weights[self._edge_mask(u, v)] = weight
+        self.weighted = True
+        self._csr = None
+        self.version += 1
 
+    @property
+    def fingerprint(self) -> str:
+        """
+        A hash of the vertices and edges, so graphs with the same vertices and edges in the same order have the same
+        fingerprint. It is computed once for each version of the graph.
+        """
+        if self._fingerprint is None or self._fingerprint[0] != self.version:
+            digest = hashlib.blake2b(repr((self.directed, self.vertices)).encode(), digest_size=16)
+            for array in (self._tails, self._heads, self._weights):
+                digest.update(array.tobytes())
+            self._fingerprint = self.version, digest.hexdigest()
+        return self._fingerprint[1]
 
+    def _build(self):
+        N = len(self.vertices)
+        if self.directed:
+            tails, heads, weights = self._tails, self._heads, self._weights
+        else:
+            tails = np.concatenate((self._tails, self._heads))
+            heads = np.concatenate((self._heads, self._tails))
+            weights = np.concatenate((self._weights, self._weights))
 
+        order = np.argsort(tails, kind='stable')
+        indptr = np.zeros(N + 1, dtype=np.int64)
+        np.cumsum(np.bincount(tails, minlength=N), out=indptr[1:])
+        self._csr = indptr, heads[order], weights[order]
 
-def dijkstra(graph, directed=False, path=None) -> tuple:
-    """"""
-    V = graph[0].copy()
-    E = graph[1].copy()
+    @property
+    def indptr(self) -> np.ndarray:
+        if self._csr is None:
+            self._build()
+        return self._csr[0]
 
-    if directed:
-        edges_on_pair = {(u, v) : [e[3] for e in E if e[:2] == (u, v)] for u in V for v in V}
+    @property
+    def indices(self) -> np.ndarray:
+        if self._csr is None:
+            self._build()
+        return self._csr[1]
+
+    @property
+    def weights(self) -> np.ndarray:
+        if self._csr is None:
+            self._build()
+        return self._csr[2]
+
+    def neighbours(self, i: int) -> np.ndarray:
+        """
+        The ids of the neighbours of the vertex with id i.
+        """
+        indptr = self.indptr
+        return self.indices[indptr[i]:indptr[i + 1]]
+
+    def degrees(self) -> np.ndarray:
+        """
+        The degree of every vertex, indexed by id. Loops count twice and for directed graphs this is the out-degree.
+        """
+        return np.diff(self.indptr)
+
+    def neighbour_weights(self, i: int) -> np.ndarray:
+        """
+        The weights of the edges to the neighbours of the vertex with id i, in the same order as neighbours(i).
+        """
+        indptr = self.indptr
+        return self.weights[indptr[i]:indptr[i + 1]]
+
+
+class EuclideanGraph:
+    """
+    A complete graph on points in the plane, where an edge is weighted by the Euclidean distance between its vertices.
+
+    Only the (n, 2) array of coordinates is stored and distances are computed when they are needed, so the graph
+    takes O(n) memory instead of the O(n^2) of an edge list. With cache_rows > 0 the most recently used rows of
+    distances are kept, at most cache_rows of them.
+
+    The vertices are labelled '0', ..., str(n - 1) unless other labels are given. graph[u, v] is the distance between
+    the vertices labelled u and v, so the graph can be used as a weight index in grafteori_module, and iterating over
+    it gives the edges [u, v, distance] in the same order as grafteori_module.euklidisk.
+    """
+
+    def __init__(self, coordinates: np.ndarray | List[List[float]], vertices: List[Hashable] | None = None,
+                 cache_rows: int = 0):
+        self.coordinates = np.asarray(coordinates, dtype=np.float64)
+        if vertices is None:
+            vertices = [str(i) for i in range(len(self.coordinates))]
+        self.vertices = list(vertices)
+        self.index = {v: i for i, v in enumerate(self.vertices)}
+        self.cache_rows = cache_rows
+        self._rows = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.vertices)
+
+    @property
+    def number_of_edges(self) -> int:
+        return len(self.vertices) * (len(self.vertices) - 1) // 2
+
+    def distance(self, i: int, j: int) -> float:
+        """
+        The distance between the vertices with ids i and j.
+        """
+        dx, dy = self.coordinates[i] - self.coordinates[j]
+        return np.hypot(dx, dy).item()
+
+    def row(self, i: int) -> np.ndarray:
+        """
+        The distances from the vertex with id i to all vertices, indexed by id.
+        """
+        if i in self._rows:
+            self._rows.move_to_end(i)
+            return self._rows[i]
+
+        difference = self.coordinates - self.coordinates[i]
+        row = np.hypot(difference[:, 0], difference[:, 1])
+        if self.cache_rows > 0:
+            self._rows[i] = row
+            if len(self._rows) > self.cache_rows:
+                self._rows.popitem(last=False)
+        return row
+
+    def __getitem__(self, pair: Tuple[Hashable, Hashable]) -> float:
+        u, v = pair
+        return self.distance(self.index[u], self.index[v])
+
+    def __contains__(self, pair: Tuple[Hashable, Hashable]) -> bool:
+        u, v = pair
+        return u in self.index and v in self.index
+
+    def get(self, pair: Tuple[Hashable, Hashable], default: Any = None) -> Any:
+        return self[pair] if pair in self else default
+
+    def __iter__(self):
+        N = len(self.vertices)
+        for i in range(N - 1):
+            row = self.row(i)[i + 1:].tolist()
+            for j in range(i + 1, N):
+                yield [self.vertices[i], self.vertices[j], row[j - i - 1]]
+
+    def nearest_neighbours(self, k: int, leaf_size: int = 64) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The ids of and distances to the k nearest neighbours of every vertex, as two (n, k) arrays sorted by distance.
+
+        The points are put in a k-d tree, split at the median along the wider side of each box until at most
+        leaf_size points are left (at least 2k + 2), so the leaves hold about the same number of points however
+        clustered they are. The points of a leaf are searched for together: the leaf itself gives a first k-th
+        nearest neighbour for every point, and the leaves whose boxes are closer than the largest of these are
+        searched nearest first, in batches of at most 16 leaves' worth of points, until the next leaf is no closer.
+        So the memory per step is bounded by the leaf size and not by the density of the points, and duplicate
+        points are neighbours at distance 0.
+
+        >>> G = EuclideanGraph([[0, 0], [0, 0], [0, 0], [5, 5], [5, 6]])
+        >>> G.nearest_neighbours(2)[1].round(3).tolist()
+        [[0.0, 0.0], [0.0, 0.0], [0.0, 0.0], [1.0, 7.071], [1.0, 7.81]]
+        >>> rng = np.random.default_rng(0)
+        >>> points = np.concatenate((rng.random((300, 2)), 0.5 + 1e-9 * rng.random((300, 2))))
+        >>> d = np.hypot(*(points[:, None] - points).transpose(2, 0, 1)) + np.diag(np.full(600, inf))
+        >>> np.allclose(EuclideanGraph(points).nearest_neighbours(5)[1], np.sort(d, axis=1)[:, :5], rtol=1e-12, atol=0)
+        True
+        """
+        N = len(self.coordinates)
+        k = min(k, N - 1)
+        if k <= 0:
+            return np.empty((N, 0), dtype=np.int64), np.empty((N, 0), dtype=np.float64)
+        leaf_size = max(leaf_size, 2 * k + 2)  # Every leaf has more than k points
+        batch_size = 16 * leaf_size
+
+        # The tree as lists of nodes: the range of order with the points of the node, its box and its children
+        order = np.arange(N)
+        ranges, boxes, children = [], [], []
+        stack = [(0, N, -1)]
+        while stack:
+            start, end, parent = stack.pop()
+            node = len(ranges)
+            if parent >= 0:
+                children[parent].append(node)
+            points = self.coordinates[order[start:end]]
+            low, high = points.min(axis=0), points.max(axis=0)
+            ranges.append((start, end))
+            boxes.append((low[0].item(), low[1].item(), high[0].item(), high[1].item()))
+            children.append([])
+            if end - start > leaf_size:
+                axis = int(np.argmax(high - low))
+                middle = (end - start) // 2
+                order[start:end] = order[start:end][np.argpartition(points[:, axis], middle)]
+                stack += [(start + middle, end, node), (start, start + middle, node)]
+
+        def gap(a: Tuple[float, ...], b: Tuple[float, ...]) -> float:
+            # The squared distance between two boxes, 0 if they overlap
+            dx, dy = max(0.0, b[0] - a[2], a[0] - b[2]), max(0.0, b[1] - a[3], a[1] - b[3])
+            return dx * dx + dy * dy
+
+        # The search compares squared distances, and the square roots are taken at the end
+        neighbours = np.empty((N, k), dtype=np.int64)
+        distances = np.empty((N, k), dtype=np.float64)
+        for leaf in [node for node in range(len(ranges)) if not children[node]]:
+            points = order[ranges[leaf][0]:ranges[leaf][1]]
+            rows = np.arange(len(points))[:, None]
+            nearest = np.full((len(points), k), -1, dtype=np.int64)
+            d_nearest = np.full((len(points), k), inf)
+
+            def search(candidates: np.ndarray) -> float:
+                # Merge the candidates into the nearest neighbours of the points and return the new bound
+                nonlocal nearest, d_nearest
+                difference = self.coordinates[candidates] - self.coordinates[points, None]
+                d = np.einsum('ijk,ijk->ij', difference, difference)
+                d[candidates == points[:, None]] = inf
+                d = np.concatenate((d_nearest, d), axis=1)
+                ids = np.concatenate((nearest, np.broadcast_to(candidates, (len(points), len(candidates)))), axis=1)
+                best = np.argpartition(d, k - 1, axis=1)[:, :k]
+                d_nearest, nearest = d[rows, best], ids[rows, best]
+                return d_nearest.max().item()
+
+            # The leaf itself gives a first bound, and the other leaves closer than it are searched nearest first
+            bound = search(points)
+            found, stack = [], [0]
+            while stack:
+                node = stack.pop()
+                g = gap(boxes[leaf], boxes[node])
+                if node == leaf or g >= bound:
+                    continue
+                if children[node]:
+                    stack += children[node]
+                else:
+                    found.append((g, node))
+            found.sort()
+            batch = []
+            for g, node in found + [(inf, -1)]:
+                if batch and (g >= bound or sum(len(b) for b in batch) >= batch_size):
+                    bound = search(np.concatenate(batch))
+                    batch = []
+                if g >= bound:
+                    break
+                batch.append(order[ranges[node][0]:ranges[node][1]])
+
+            by_distance = np.argsort(d_nearest, axis=1, kind='stable')
+            neighbours[points] = nearest[rows, by_distance]
+            distances[points] = np.sqrt(d_nearest[rows, by_distance])
+
+        return neighbours, distances
+
+    def candidate_edges(self, k: int = 10) -> List[List[Any]]:
+        """
+        The sparse candidate graph where every vertex is joined to its k nearest neighbours.
+
+        An edge is included once if either of its vertices is among the k nearest neighbours of the other, and the
+        edges [u, v, distance] are ordered by the ids of u and v like the iteration over the complete graph.
+        """
+        neighbours, distances = self.nearest_neighbours(k)
+        N = len(self.coordinates)
+        tails = np.repeat(np.arange(N), neighbours.shape[1])
+        heads = neighbours.ravel()
+        pairs = np.unique(np.stack([np.minimum(tails, heads), np.maximum(tails, heads)], axis=1), axis=0)
+        weights = self.coordinates[pairs[:, 0]] - self.coordinates[pairs[:, 1]]
+        weights = np.hypot(weights[:, 0], weights[:, 1])
+        return [[self.vertices[i], self.vertices[j], w] for (i, j), w in zip(pairs.tolist(), weights.tolist())]
+
+
+class ShortestPathTree:
+    """
+    The shortest paths from a source vertex to every vertex of a graph.
+
+    distances[i] is the length of a shortest path from the source to the vertex with id i and predecessors[i] is the
+    id of the vertex before it on that path. The source and the vertices that cannot be reached have the predecessor
+    -1, and unreachable vertices keep the initial distance, inf unless the algorithm uses another value for infinity.
+    """
+
+    def __init__(self, vertices: List[Hashable], source: Hashable, distances: List[int | float],
+                 predecessors: List[int], index: dict | None = None):
+        # Trees of the same graph can share the list of vertices and the index from vertex to id
+        self.vertices = list(vertices) if index is None else vertices
+        self.index = {v: i for i, v in reversed(list(enumerate(self.vertices)))} if index is None else index
+        self.source = source
+        self.distances = distances
+        self.predecessors = predecessors
+
+    def __contains__(self, vertex: Hashable) -> bool:
+        """
+        Whether there is a path from the source to the vertex.
+        """
+        i = self.index[vertex]
+        return self.predecessors[i] != -1 or vertex == self.source
+
+    def distance_to(self, vertex: Hashable) -> int | float:
+        return self.distances[self.index[vertex]]
+
+    def path_to(self, vertex: Hashable) -> List[Hashable]:
+        """
+        The vertices on a shortest path from the source to the vertex, or an empty list if there is no path. The path
+        is found by following the predecessors back from the vertex, so it takes time proportional to its length.
+        """
+        if vertex not in self:
+            return []
+        path = [self.index[vertex]]
+        while self.predecessors[path[-1]] != -1:
+            path.append(self.predecessors[path[-1]])
+        return [self.vertices[i] for i in reversed(path)]
+
+
+class LandmarkTable:
+    """
+    Distances from a few landmark vertices to every vertex, used as lower bounds for point-to-point queries (ALT).
+
+    distances[i, l] is the distance from the l-th landmark to the vertex with id i, so by the triangle inequality
+    |distances[u, l] - distances[v, l]| is at most the distance between u and v in an undirected graph. The largest
+    of these differences over the landmarks is an admissible estimate for A* search. The table is stored as a single
+    numpy array with one row per vertex, int32 when the distances are integers below 2^31, so it takes 4k bytes per
+    vertex. Vertices a landmark cannot reach have the distance inf, and a landmark that reaches neither u nor v
+    gives no bound for them.
+    """
+
+    def __init__(self, vertices: List[Hashable], landmarks: List[int], distances: np.ndarray):
+        self.vertices = list(vertices)
+        self.index = {v: i for i, v in reversed(list(enumerate(self.vertices)))}
+        self.landmarks = list(landmarks)
+        self.distances = distances
+
+    def __len__(self) -> int:
+        return len(self.landmarks)
+
+    @staticmethod
+    def _bound(row: np.ndarray, other: np.ndarray) -> int | float:
+        # inf - inf is nan for the landmarks that reach neither vertex, and fmax skips it
+        with np.errstate(invalid='ignore'):
+            return np.fmax.reduce(np.abs(row - other), initial=0).item()
+
+    def lower_bound(self, u: Hashable, v: Hashable) -> int | float:
+        """
+        A lower bound for the distance between u and v.
+        """
+        return self._bound(self.distances[self.index[u]], self.distances[self.index[v]])
+
+    def heuristic(self, target: Hashable):
+        """
+        The function h(v) = lower_bound(v, target), with the row of the target looked up once.
+        """
+        row, distances, index, bound = self.distances[self.index[target]], self.distances, self.index, self._bound
+        return lambda v: bound(distances[index[v]], row)
+
+    def save(self, path: str):
+        """
+        Save the table to an .npz file, which can be read back with LandmarkTable.load. The vertices are saved as an
+        object array, so labels of any type, such as tuples or a mix of strings and numbers, come back unchanged.
+        """
+        vertices = np.empty(len(self.vertices), dtype=object)
+        for i, v in enumerate(self.vertices):
+            vertices[i] = v
+        np.savez(path, vertices=vertices, landmarks=np.array(self.landmarks, dtype=np.int64),
+                 distances=self.distances)
+
+    @classmethod
+    def load(cls, path: str) -> 'LandmarkTable':
+        """
+        Read a table saved with save. The vertices are unpickled, so only load files from a trusted source.
+        """
+        with np.load(path, allow_pickle=True) as data:
+            return cls(data['vertices'].tolist(), data['landmarks'].tolist(), data['distances'])
+
+
+def _dijkstra(indptr: List[int], indices: List[int], weights: List[float], source: int,
+              targets: Set[int] | None = None) -> Tuple[List, List]:
+    # Distances and predecessors from the vertex with id source, over CSR arrays given as lists. With a set of target
+    # ids the search stops once they are all settled, and only their distances are final
+    N = len(indptr) - 1
+    distance = [inf] * N
+    predecessor = [-1] * N
+    distance[source] = 0
+    heap = [(0, source)]
+    remaining = len(targets) if targets is not None else -1
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > distance[u]:
+            continue
+        if targets is not None and u in targets:
+            remaining -= 1
+            if remaining == 0:
+                break
+        for k in range(indptr[u], indptr[u + 1]):
+            if d + weights[k] < distance[indices[k]]:
+                distance[indices[k]] = d + weights[k]
+                predecessor[indices[k]] = u
+                heapq.heappush(heap, (distance[indices[k]], indices[k]))
+
+    return distance, predecessor
+
+
+def single_source_dijkstra(graph: Graph, source: Hashable) -> ShortestPathTree:
+    """
+    Find the shortest paths from a source vertex to every vertex in a weighted graph with Dijkstra's algorithm.
+    """
+    indptr, indices, weights = graph.indptr.tolist(), graph.indices.tolist(), graph.weights.tolist()
+    distance, predecessor = _dijkstra(indptr, indices, weights, graph.index[source])
+
+    return ShortestPathTree(graph.vertices, source, distance, predecessor, graph.index)
+
+
+def dijkstra(graph: Graph) -> dict:
+    """
+    Find all minimal distances between vertices in a weighted graph, running Dijkstra's algorithm from every vertex.
+    """
+    distances = {}
+    for u in graph.vertices:
+        tree = single_source_dijkstra(graph, u)
+        for v, d in zip(graph.vertices, tree.distances):
+            distances[(u, v)] = d
+
+    return distances
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    trees: int
+    nbytes: int
+    max_bytes: int
+
+
+class ShortestPathCache:
+    """
+    A least recently used cache of shortest path trees, keyed by the fingerprint of a graph, the source vertex and the
+    distance the solver gives unreachable vertices.
+
+    A query between any two vertices is answered from the tree of the source, so a service that sees the same sources
+    over and over only runs Dijkstra's algorithm once per source. The trees are evicted in least recently used order
+    when their estimated size exceeds max_bytes. Changing a Graph through its methods changes its fingerprint, and the
+    trees of the old version are dropped the next time the cache is used with the graph. A graph that is rebuilt for
+    every query, e.g. from an edge list, can pass an owner instead, and the trees of the old version are dropped when
+    the owner comes back with a new fingerprint. An owner is forgotten when the last tree of its fingerprint is
+    evicted, so owners that are never seen again do not pile up.
+
+    >>> cache = ShortestPathCache(max_bytes=2000)
+    >>> for n in range(2, 200):
+    ...     _ = cache.tree(Graph(range(n), [(i, i + 1, 1) for i in range(n - 1)]), 0, owner=n)
+    >>> len(cache), len(cache._owners) == len(cache._owned) == len(cache._keys) == len(cache)
+    (1, True)
+    """
+
+    def __init__(self, max_bytes: int = 64 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self._trees = OrderedDict()
+        self._sizes = {}
+        self._fingerprints = weakref.WeakKeyDictionary()  # The fingerprint each graph had when it was last used
+        self._owners = {}  # The same for the owners of rebuilt graphs
+        self._owned = {}  # The owners of each fingerprint
+        self._keys = {}  # The keys of the trees of each fingerprint
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._trees)
+
+    def _invalidate(self, fingerprint: str):
+        for key in list(self._keys.get(fingerprint, ())):
+            self._remove(key)
+
+    def _remove(self, key: Tuple[str, Hashable, int | float]):
+        del self._trees[key]
+        self.nbytes -= self._sizes.pop(key)
+        keys = self._keys[key[0]]
+        keys.discard(key)
+        if not keys:
+            # The last tree of the fingerprint is gone, and so are the reasons to remember its owners
+            del self._keys[key[0]]
+            for owner in self._owned.pop(key[0], ()):
+                del self._owners[owner]
+
+    @staticmethod
+    def _size(tree: ShortestPathTree, graph: Graph) -> int:
+        # The lists and, roughly, the numbers in them, and the vertices and the index if they are not the graph's own
+        size = sys.getsizeof(tree.distances) + sys.getsizeof(tree.predecessors) + 56 * len(tree.distances)
+        if tree.index is not graph.index:
+            size += sys.getsizeof(tree.vertices) + sys.getsizeof(tree.index)
+        return size
+
+    def tree(self, graph: Graph, source: Hashable,
+             solver: Callable[[Graph, Hashable], ShortestPathTree] | None = None,
+             infinity: int | float = inf, owner: Hashable | None = None) -> ShortestPathTree:
+        """
+        The shortest path tree from source, found with solver(graph, source) if it is not in the cache. The solver is
+        single_source_dijkstra unless another is given, and infinity is the distance it gives unreachable vertices.
+        """
+        fingerprint = graph.fingerprint
+        previous = self._fingerprints.get(graph) if owner is None else self._owners.get(owner)
+        if previous is not None and previous != fingerprint:
+            self._invalidate(previous)
+        if owner is None:
+            self._fingerprints[graph] = fingerprint
+
+        key = (fingerprint, source, infinity)
+        if key in self._trees:
+            self.hits += 1
+            self._trees.move_to_end(key)
+            tree = self._trees[key]
+        else:
+            self.misses += 1
+            tree = (solver or single_source_dijkstra)(graph, source)
+            self._trees[key] = tree
+            self._sizes[key] = self._size(tree, graph)
+            self._keys.setdefault(fingerprint, set()).add(key)
+            self.nbytes += self._sizes[key]
+            while self.nbytes > self.max_bytes and len(self._trees) > 1:
+                self._remove(next(iter(self._trees)))
+                self.evictions += 1
+
+        # The owner is only remembered while its fingerprint has trees, and the newest tree is never evicted
+        if owner is not None:
+            self._owners[owner] = fingerprint
+            self._owned.setdefault(fingerprint, set()).add(owner)
+        return tree
+
+    def shortest_path(self, graph: Graph, source: Hashable, target: Hashable) -> Tuple[List[Hashable], int | float]:
+        """
+        A shortest path from source to target and its length, or an empty list and the distance of an unreachable
+        vertex if there is no path.
+        """
+        tree = self.tree(graph, source)
+        return tree.path_to(target), tree.distance_to(target)
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.evictions, len(self._trees), self.nbytes, self.max_bytes)
+
+    def clear(self):
+        self._trees.clear()
+        self._sizes.clear()
+        self._fingerprints.clear()
+        self._owners.clear()
+        self._owned.clear()
+        self._keys.clear()
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+
+class ContractionHierarchy:
+    """
+    A contraction hierarchy of an undirected graph with non-negative weights, for fast point-to-point queries.
+
+    The vertices are contracted one at a time in order of increasing priority, the edge difference (the number of
+    shortcuts contracting the vertex would add minus its number of remaining edges) plus the number of its neighbours
+    already contracted, which spreads the contractions over the graph. Contracting v removes it from the graph and adds
+    a shortcut u - w of weight w(u, v) + w(v, w) for each pair of remaining neighbours, unless a local witness search
+    from u finds a path to w avoiding v that is no longer. The witness search settles at most witness_limit vertices
+    and adds the shortcut if it gives up. The priorities are only estimates, recomputed many times, so their witness
+    searches settle at most estimate_limit vertices, which keeps the preprocessing fast on dense graphs. Too low a
+    witness_limit adds shortcuts that are not needed, and every query then has more edges to search.
+
+    Every shortest path then goes up the hierarchy and down again, so a query is two Dijkstra searches from the source
+    and the target that only follow edges to vertices contracted later. They settle few vertices even in large graphs.
+    """
+
+    def __init__(self, graph: Graph, witness_limit: int = 300, estimate_limit: int = 20):
+        if graph.directed:
+            raise ValueError('ContractionHierarchy only supports undirected graphs')
+
+        self.vertices = list(graph.vertices)
+        self.index = dict(graph.index)
+        self.witness_limit = witness_limit
+        self.estimate_limit = estimate_limit
+        N = len(self.vertices)
+
+        # The remaining graph, with the lightest edge between each pair of vertices
+        self._adjacency = [{} for _ in range(N)]
+        indptr, indices, weights = graph.indptr.tolist(), graph.indices.tolist(), graph.weights.tolist()
+        for u in range(N):
+            for k in range(indptr[u], indptr[u + 1]):
+                v, w = indices[k], weights[k]
+                if u != v and w < self._adjacency[u].get(v, inf):
+                    self._adjacency[u][v] = w
+
+        self.middle = {}  # The contracted vertex a shortcut (u, w) with u < w goes around
+        self.rank = [0] * N
+        self.upward = [[] for _ in range(N)]  # (v, weight) for the edges to vertices contracted later
+        self.shortcuts = 0
+        self._contract_all()
+        del self._adjacency
+
+    def _witness_distances(self, source: int, excluded: int, targets: set, limit: float, settle: int) -> dict:
+        # Distances from source in the remaining graph without the excluded vertex, up to limit or until every
+        # target or settle vertices are settled
+        adjacency = self._adjacency
+        distance = {source: 0}
+        heap = [(0, source)]
+        settled, remaining = 0, len(targets)
+        while heap and settled < settle and remaining > 0:
+            d, u = heapq.heappop(heap)
+            if d > distance[u]:
+                continue
+            if d > limit:
+                break
+            settled += 1
+            if u in targets:
+                remaining -= 1
+            for v, w in adjacency[u].items():
+                if v != excluded and d + w < distance.get(v, inf):
+                    distance[v] = d + w
+                    heapq.heappush(heap, (d + w, v))
+
+        return distance
+
+    def _shortcuts(self, v: int, settle: int) -> List[Tuple[int, int, float]]:
+        # The shortcuts (u, w, weight) needed to contract v
+        neighbours = list(self._adjacency[v].items())
+        shortcuts = []
+        for i, (u, w_uv) in enumerate(neighbours[:-1]):
+            # An edge u - x is a witness on its own, so only the other neighbours need a search
+            direct = self._adjacency[u]
+            targets = [(x, w_vx) for x, w_vx in neighbours[i + 1:] if w_uv + w_vx < direct.get(x, inf)]
+            if not targets:
+                continue
+            distance = self._witness_distances(u, v, {x for x, _ in targets},
+                                               w_uv + max(w_vx for _, w_vx in targets), settle)
+            for x, w_vx in targets:
+                if w_uv + w_vx < distance.get(x, inf):
+                    shortcuts.append((u, x, w_uv + w_vx))
+
+        return shortcuts
+
+    def _priority(self, v: int, contracted_neighbours: List[int]) -> int:
+        return len(self._shortcuts(v, self.estimate_limit)) - len(self._adjacency[v]) + contracted_neighbours[v]
+
+    def _contract_all(self):
+        N = len(self.vertices)
+        contracted_neighbours = [0] * N
+        heap = [(self._priority(v, contracted_neighbours), v) for v in range(N)]
+        heapq.heapify(heap)
+        rank = 0
+        while heap:
+            _, v = heapq.heappop(heap)
+            # The priorities of other vertices may have changed, so v is only contracted if it is still the smallest
+            priority = self._priority(v, contracted_neighbours)
+            if heap and priority > heap[0][0]:
+                heapq.heappush(heap, (priority, v))
+                continue
+
+            for u, x, w in self._shortcuts(v, self.witness_limit):
+                self._adjacency[u][x] = self._adjacency[x][u] = w
+                self.middle[(min(u, x), max(u, x))] = v
+                self.shortcuts += 1
+
+            self.rank[v] = rank
+            rank += 1
+            for u, w in self._adjacency[v].items():
+                self.upward[v].append((u, w))
+                del self._adjacency[u][v]
+                contracted_neighbours[u] += 1
+            self._adjacency[v] = {}
+
+    def _upward_search(self, source: int, other: dict, best: list) -> Tuple[dict, dict]:
+        # Distances and predecessors in the upward graph from source, tracking the best meeting vertex with the
+        # distances of the other search in best = [distance, vertex]. The search stops when it cannot improve best.
+        distance, predecessor = {source: 0}, {source: -1}
+        heap = [(0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d >= best[0]:
+                break
+            if d > distance[u]:
+                continue
+            if u in other and d + other[u] < best[0]:
+                best[0], best[1] = d + other[u], u
+            for v, w in self.upward[u]:
+                if d + w < distance.get(v, inf):
+                    distance[v] = d + w
+                    predecessor[v] = u
+                    heapq.heappush(heap, (d + w, v))
+
+        return distance, predecessor
+
+    def _unpack(self, u: int, v: int) -> List[int]:
+        # The vertices on the original path behind the edge or shortcut from u to v, without u
+        path, stack = [], [(u, v)]
+        while stack:
+            u, v = stack.pop()
+            middle = self.middle.get((min(u, v), max(u, v)))
+            if middle is None:
+                path.append(v)
+            else:
+                stack.append((middle, v))
+                stack.append((u, middle))
+
+        return path
+
+    def query(self, source: Hashable, target: Hashable) -> Tuple[List[Hashable], int | float]:
+        """
+        A shortest path from source to target and its length, or an empty list and inf if there is no path.
+        """
+        s, t = self.index[source], self.index[target]
+        best = [inf, -1]
+        forward, forward_predecessor = self._upward_search(s, {}, best)
+        backward, backward_predecessor = self._upward_search(t, forward, best)
+        if best[1] == -1:
+            return [], inf
+
+        up = [best[1]]
+        while forward_predecessor[up[-1]] != -1:
+            up.append(forward_predecessor[up[-1]])
+        down = [best[1]]
+        while backward_predecessor[down[-1]] != -1:
+            down.append(backward_predecessor[down[-1]])
+
+        up.reverse()
+        path = [s]
+        for u, v in zip(up + down[1:], up[1:] + down[1:]):
+            path += self._unpack(u, v)
+
+        return [self.vertices[i] for i in path], best[0]
+
+
+class DynamicShortestPaths(ShortestPathTree):
+    """
+    A shortest path tree from a source that is repaired when an edge weight changes, instead of being recomputed.
+
+    When an edge gets lighter, only the vertices it gives a shorter path are relaxed, with Dijkstra's algorithm
+    started from the end of the edge. When a tree edge gets heavier, only the subtree below it can change: its vertices
+    get the best distance through an in-neighbour outside the subtree and Dijkstra's algorithm runs within the
+    subtree (Ramalingam and Reps). The work is proportional to the part of the tree that changes. The weights must be
+    non-negative, and vertices and edges cannot be added while the tree is kept. An edge is removed by giving it the
+    weight inf.
+
+    >>> paths = DynamicShortestPaths(Graph(['a', 'b', 'c'], [('a', 'b', 1), ('b', 'c', 1), ('a', 'c', 5)]), 'a')
+    >>> paths.update_weight('a', 'b', 10), paths.distances, paths.path_to('c')
+    (2, [0, 6.0, 5.0], ['a', 'c'])
+    >>> paths.update_weight('a', 'c', 2), paths.distances, paths.path_to('b')
+    (2, [0, 3.0, 2.0], ['a', 'c', 'b'])
+    >>> paths.update_weight('a', 'c', inf), paths.distances, paths.path_to('c')
+    (2, [0, 10.0, 11.0], ['a', 'b', 'c'])
+
+    Lighter, heavier and removed edges in a random directed graph give the same distances as a new search:
+
+    >>> rng = np.random.default_rng(0)
+    >>> graph = Graph(range(30), rng.integers(0, 30, (120, 3)).tolist(), directed=True)
+    >>> paths, same = DynamicShortestPaths(graph, 0), True
+    >>> for u, v, _ in graph.edges[:40]:
+    ...     for weight in (graph.weight(u, v) / 2, 3 * graph.weight(u, v) + 1, inf):
+    ...         _ = paths.update_weight(u, v, weight)
+    ...         same &= paths.distances == single_source_dijkstra(graph, 0).distances
+    >>> same
+    True
+    """
+
+    def __init__(self, graph: Graph, source: Hashable):
+        if np.any(graph.weights < 0):
+            raise ValueError('DynamicShortestPaths needs non-negative weights')
+        tree = single_source_dijkstra(graph, source)
+        super().__init__(graph.vertices, source, tree.distances, tree.predecessors, graph.index)
+        self.graph = graph
+
+        N = len(graph)
+        self._out = [{} for _ in range(N)]  # The lightest edge to each neighbour
+        self._in = [{} for _ in range(N)] if graph.directed else self._out
+        indptr, indices, weights = graph.indptr.tolist(), graph.indices.tolist(), graph.weights.tolist()
+        for u in range(N):
+            for k in range(indptr[u], indptr[u + 1]):
+                v, w = indices[k], weights[k]
+                if w < self._out[u].get(v, inf):
+                    self._out[u][v] = self._in[v][u] = w
+
+        self._children = [set() for _ in range(N)]
+        for v, u in enumerate(self.predecessors):
+            if u != -1:
+                self._children[u].add(v)
+
+    def _set_predecessor(self, v: int, u: int):
+        if self.predecessors[v] != -1:
+            self._children[self.predecessors[v]].discard(v)
+        self.predecessors[v] = u
+        if u != -1:
+            self._children[u].add(v)
+
+    def _relax(self, heap: List[Tuple[float, int]], changed: Set[int]):
+        # Dijkstra's algorithm from the vertices in the heap
+        distance = self.distances
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > distance[u]:
+                continue
+            for v, w in self._out[u].items():
+                if d + w < distance[v]:
+                    distance[v] = d + w
+                    self._set_predecessor(v, u)
+                    changed.add(v)
+                    heapq.heappush(heap, (d + w, v))
+
+    def update_weight(self, u: Hashable, v: Hashable, weight: int | float) -> int:
+        """
+        Change the weight of the edge between u and v in the graph and repair the tree. Returns the number of vertices
+        whose distance from the source changed.
+        """
+        if weight < 0:
+            raise ValueError('DynamicShortestPaths needs non-negative weights')
+        weight = float(weight)  # The weights are floats like in the graph
+        self.graph.set_weight(u, v, weight)
+        i, j = self.index[u], self.index[v]
+        arcs = [(i, j)] if self.graph.directed else [(i, j), (j, i)]
+        previous = self._out[i][j]
+        for a, b in arcs:
+            self._out[a][b] = self._in[b][a] = weight
+
+        distance, changed, heap = self.distances, set(), []
+        if weight < previous:
+            for a, b in arcs:
+                if distance[a] + weight < distance[b]:
+                    distance[b] = distance[a] + weight
+                    self._set_predecessor(b, a)
+                    changed.add(b)
+                    heapq.heappush(heap, (distance[b], b))
+            self._relax(heap, changed)
+
+        elif weight > previous:
+            # The subtrees below the edge are the only vertices whose shortest paths can have used it
+            affected = [b for a, b in arcs if self.predecessors[b] == a]
+            for x in affected:
+                affected.extend(self._children[x])
+            before = {x: distance[x] for x in affected}
+            for x in affected:
+                distance[x] = inf
+            for x in affected:
+                best, parent = inf, -1
+                for y, w in self._in[x].items():
+                    if distance[y] + w < best:
+                        best, parent = distance[y] + w, y
+                distance[x] = best
+                self._set_predecessor(x, parent)
+                if best < inf:
+                    heapq.heappush(heap, (best, x))
+            self._relax(heap, set())
+            changed = {x for x in affected if distance[x] != before[x]}
+
+        return len(changed)
+
+
+class DynamicAllPairs:
+    """
+    A matrix of all minimal distances that is updated when an edge weight changes, instead of being recomputed.
+
+    distances is indexed by vertex id with inf for unreachable pairs and on the diagonal, like all_pairs_shortest_paths.
+    When the edge from u to v gets lighter, a pair (i, j) can only improve by going through it, so the whole matrix is
+    updated with the column of u and the row of v in O(N^2) numpy operations. When it gets heavier, only the rows of
+    the sources with a shortest path through the edge can change, and those rows are found again with Dijkstra's
+    algorithm. The weights must be non-negative, and an edge is removed by giving it the weight inf.
+
+    >>> rng = np.random.default_rng(1)
+    >>> for directed in (False, True):
+    ...     graph = Graph(range(30), rng.integers(0, 30, (80, 3)).tolist(), directed=directed)
+    ...     pairs, same = DynamicAllPairs(graph), True
+    ...     for u, v, _ in graph.edges[:30]:
+    ...         for weight in (graph.weight(u, v) / 2, 3 * graph.weight(u, v) + 1, inf):
+    ...             _ = pairs.update_weight(u, v, weight)
+    ...             same &= np.array_equal(pairs.distances, all_pairs_shortest_paths(graph))
+    ...     print(directed, same)
+    False True
+    True True
+    """
+
+    def __init__(self, graph: Graph):
+        if np.any(graph.weights < 0):
+            raise ValueError('DynamicAllPairs needs non-negative weights')
+        self.graph = graph
+        self.distances = all_pairs_shortest_paths(graph)
+
+    def _column_row(self, a: int, b: int) -> Tuple[np.ndarray, np.ndarray]:
+        # The distances to a and from b, with 0 instead of inf for a to a and b to b
+        column, row = self.distances[:, a].copy(), self.distances[b].copy()
+        column[a] = row[b] = 0
+        return column, row
+
+    def update_weight(self, u: Hashable, v: Hashable, weight: int | float) -> int:
+        """
+        Change the weight of the edge between u and v in the graph and update the distances. Returns the number of
+        entries of the matrix that changed.
+        """
+        if weight < 0:
+            raise ValueError('DynamicAllPairs needs non-negative weights')
+        previous = self.graph.weight(u, v)
+        self.graph.set_weight(u, v, weight)
+        i, j = self.graph.index[u], self.graph.index[v]
+        arcs = [(i, j)] if self.graph.directed else [(i, j), (j, i)]
+
+        D = self.distances
+        before = D.copy()
+        if weight < previous:
+            for a, b in arcs:
+                column, row = self._column_row(a, b)
+                np.minimum(D, column[:, None] + weight + row[None, :], out=D)
+            D[np.diag_indices(len(D))] = inf
+
+        elif weight > previous:
+            # The sources with a shortest path through the edge, allowing for rounding in the sums
+            sources = np.zeros(len(D), dtype=bool)
+            for a, b in arcs:
+                column, row = self._column_row(a, b)
+                through = column[:, None] + previous + row[None, :] <= D + 1e-9 * np.abs(D)
+                sources |= np.any(through & np.isfinite(D), axis=1)
+            indptr, indices, weights = self.graph.indptr.tolist(), self.graph.indices.tolist(), self.graph.weights.tolist()
+            for source in np.flatnonzero(sources).tolist():
+                D[source] = _dijkstra(indptr, indices, weights, source)[0]
+                D[source, source] = inf
+
+        return int(np.count_nonzero(before != D))
+
+
+def bellman_ford_potentials(graph: Graph) -> np.ndarray:
+    """
+    Find a potential h for every vertex, such that w + h[u] - h[v] >= 0 for every edge from u to v with weight w.
+
+    The potentials are the distances from an extra vertex with an edge of weight 0 to every vertex, found with the
+    Bellman-Ford algorithm where each round relaxes all edges at once. A ValueError is raised if the graph has a
+    cycle of negative weight, which for undirected graphs is any edge of negative weight.
+    """
+    N = len(graph)
+    tails = np.repeat(np.arange(N), np.diff(graph.indptr))
+    heads, weights = graph.indices, graph.weights
+
+    potentials = np.zeros(N)
+    for _ in range(N):
+        relaxed = potentials.copy()
+        np.minimum.at(relaxed, heads, potentials[tails] + weights)
+        if np.array_equal(relaxed, potentials):
+            return potentials
+        potentials = relaxed
+
+    raise ValueError('The graph has a cycle of negative weight')
+
+
+def johnson(graph: Graph) -> np.ndarray:
+    """
+    Find all minimal distances between vertices in a sparse weighted graph with Johnson's algorithm.
+
+    If some weights are negative, they are first made non-negative with the potentials from bellman_ford_potentials.
+    Then Dijkstra's algorithm runs from every vertex over the CSR arrays, which takes O(N (E + N) log N) time instead
+    of the O(N^3) of Floyd-Warshall. The distances are returned as a matrix indexed by vertex id, with inf for
+    unreachable pairs and on the diagonal like the graph matrices in graph_theory_matrix.
+    """
+    N = len(graph)
+    weights, potentials = _nonnegative_weights(graph)
+
+    indptr, indices, weights = graph.indptr.tolist(), graph.indices.tolist(), weights.tolist()
+    distances = np.empty((N, N))
+    for source in range(N):
+        distances[source] = _dijkstra(indptr, indices, weights, source)[0]
+
+    return _restore_distances(distances, potentials)
+
+
+def _nonnegative_weights(graph: Graph) -> Tuple[np.ndarray, np.ndarray | None]:
+    # The CSR weights, reweighted with Bellman-Ford potentials if some are negative, and the potentials used
+    if not np.any(graph.weights < 0):
+        return graph.weights, None
+    potentials = bellman_ford_potentials(graph)
+    tails = np.repeat(np.arange(len(graph)), np.diff(graph.indptr))
+    return np.maximum(graph.weights + potentials[tails] - potentials[graph.indices], 0), potentials
+
+
+def _restore_distances(distances: np.ndarray, potentials: np.ndarray | None) -> np.ndarray:
+    # Undo the reweighting a block of rows at a time, so no temporary as large as distances is needed when it is a
+    # memmap, and set the diagonal to inf
+    if potentials is not None:
+        block = max(1, 2 ** 20 // max(len(distances), 1))
+        for start in range(0, len(distances), block):
+            distances[start:start + block] += potentials[None, :] - potentials[start:start + block, None]
+    distances[np.diag_indices(len(distances))] = inf
+    return distances
+
+
+def terminal_distances(graph: Graph, terminals: List[Hashable]) -> np.ndarray:
+    """
+    Find the minimal distances between the terminal vertices, as a matrix in the order of terminals with inf for
+    unreachable pairs and on the diagonal.
+
+    Dijkstra's algorithm runs from each terminal and stops as soon as every terminal is settled, so with few
+    terminals in a large graph only the part of the graph around and between the terminals is searched, and the
+    result takes |T|^2 memory instead of N^2. Negative weights are handled with potentials as in johnson.
+    """
+    weights, potentials = _nonnegative_weights(graph)
+    ids = [graph.index[t] for t in terminals]
+    targets = set(ids)
+
+    indptr, indices, weights = graph.indptr.tolist(), graph.indices.tolist(), weights.tolist()
+    distances = np.empty((len(ids), len(ids)))
+    for row, source in enumerate(ids):
+        distance = _dijkstra(indptr, indices, weights, source, targets)[0]
+        distances[row] = [distance[i] for i in ids]
+
+    if potentials is not None:
+        potentials = potentials[ids]
+    return _restore_distances(distances, potentials)
+
+
+_johnson_worker = {}  # The CSR lists and the result matrix of the parallel_johnson worker process
+
+
+def _init_johnson_worker(csr: Tuple[Any, Any, Any], N: int, result: Any):
+    # Initializer of the parallel_johnson worker processes: the CSR arrays are read from shared memory once, and the
+    # result is the shared matrix, or the file of the memmap given as out, as a tuple (filename, offset)
+    _johnson_worker['csr'] = [np.frombuffer(array, dtype=dtype).tolist()
+                              for array, dtype in zip(csr, (np.int64, np.int64, np.float64))]
+    if isinstance(result, tuple):
+        _johnson_worker['result'] = np.memmap(result[0], dtype=np.float64, mode='r+', offset=result[1], shape=(N, N))
     else:
-        edges_on_pair = {(u, v): [e[3] for e in E if e[:2] == (u, v) or e[:2] == (v, u)] for u in V for v in V}
+        _johnson_worker['result'] = np.frombuffer(result, dtype=np.float64).reshape(N, N)
 
-    distances = {(u, v) : min(edges_on_pair[(u, v)] + [inf if u != v else 0]) for u in V for v in V}
 
-    for u in V:
-        vertices_not_traversed = V.copy().remove(u)
-        for _ in range(len(V) - 1):
-            minimum_vertex = min({v : distances[(u, v)] for v in vertices_not_traversed})
-            vertices_not_traversed.remove(minimum_vertex)
-            for v in vertices_not_traversed:
-                if distances[(u, v)] > distances[(u, minimum_vertex)] + min(edges_on_pair[(minimum_vertex, v)]):
-                    distances[(u, v)] = distances[(u, minimum_vertex)] + min(edges_on_pair[(minimum_vertex, v)])
+def _dijkstra_rows(sources: range) -> range:
+    # Worker for parallel_johnson: the distances from each source are written straight into its row of the result,
+    # so only the range of sources is sent back
+    indptr, indices, weights = _johnson_worker['csr']
+    result = _johnson_worker['result']
+    for source in sources:
+        result[source] = _dijkstra(indptr, indices, weights, source)[0]
+    return sources
+
+
+def parallel_johnson(graph: Graph, processes: int | None = None, chunk_size: int | None = None,
+                     out: np.memmap | None = None) -> np.ndarray:
+    """
+    Johnson's algorithm with the sources shared out between a pool of processes.
+
+    The CSR arrays and the result matrix are put in shared memory, so each worker process reads the graph once
+    instead of having it pickled with every task, and writes the rows for its sources straight into the result. The
+    sources are sent in chunks of chunk_size, by default four chunks per process, and only the ranges of sources go
+    between the processes. The returned matrix is the shared one, so the N x N distances are only held once. With out,
+    a float64 np.memmap of shape (N, N) opened for writing, the workers write into its file instead, for graphs whose
+    distances do not fit in memory. processes=None uses as many processes as there are cores. The result is the same
+    as for johnson.
+    """
+    N = len(graph)
+    if out is not None and not (isinstance(out, np.memmap) and out.dtype == np.float64 and out.shape == (N, N)
+                                and out.flags.c_contiguous and out.flags.writeable):
+        raise ValueError(f'Expected out to be a writeable float64 np.memmap of shape {(N, N)}')
+
+    weights, potentials = _nonnegative_weights(graph)
+    csr = []
+    for array, code in ((graph.indptr, 'q'), (graph.indices, 'q'), (weights, 'd')):
+        csr.append(RawArray(code, len(array)))
+        np.frombuffer(csr[-1], dtype=np.int64 if code == 'q' else np.float64)[:] = array
 
+    if out is None:
+        result = RawArray('d', N * N)
+        distances = np.frombuffer(result, dtype=np.float64).reshape(N, N)
+    else:
+        out.flush()
+        result, distances = (out.filename, out.offset), out
+
+    if chunk_size is None:
+        chunk_size = max(1, -(-N // (4 * (processes or os.cpu_count() or 1))))
+    with ProcessPoolExecutor(processes, initializer=_init_johnson_worker, initargs=(tuple(csr), N, result)) as pool:
+        tasks = [pool.submit(_dijkstra_rows, range(start, min(start + chunk_size, N)))
+                 for start in range(0, N, chunk_size)]
+        for task in tasks:
+            task.result()
+
+    _restore_distances(distances, potentials)
+    if out is not None:
+        out.flush()
     return distances
 
+
+def all_pairs_shortest_paths(graph: Graph, method: str | None = None, processes: int | None = None) -> np.ndarray:
+    """
+    Find all minimal distances between vertices as a matrix indexed by vertex id, with inf for unreachable pairs and
+    on the diagonal.
+
+    The method is 'johnson', 'floyd_warshall' or 'blocked_floyd_warshall'. By default Johnson's algorithm is used
+    when the graph is sparse, with fewer than N^2 / 100 edges, or has negative weights, and the vectorized
+    Floyd-Warshall algorithm from graph_theory_matrix otherwise. With processes > 1 Johnson's algorithm runs on that
+    many processes, and a dense graph goes to blocked_floyd_warshall on that many threads. The blocked version can
+    also be chosen on its own, and then processes=None uses all cores.
+    """
+    N = len(graph)
+    parallel = processes is not None and processes > 1
+    if method is None:
+        sparse = graph.number_of_edges < N * N / 100
+        if sparse or np.any(graph.weights < 0):
+            method = 'johnson'
+        else:
+            method = 'blocked_floyd_warshall' if parallel else 'floyd_warshall'
+
+    if method == 'johnson' and parallel:
+        return parallel_johnson(graph, processes)
+    if method == 'johnson':
+        return johnson(graph)
+    if method in ('floyd_warshall', 'blocked_floyd_warshall'):
+        from graph_theory_matrix import blocked_floyd_warshall, floyd_warshall as vectorized_floyd_warshall
+
+        matrix = np.full((N, N), inf)
+        np.minimum.at(matrix, (np.repeat(np.arange(N), np.diff(graph.indptr)), graph.indices), graph.weights)
+        matrix[np.diag_indices(N)] = inf
+        if method == 'blocked_floyd_warshall':
+            return blocked_floyd_warshall(matrix, directed=True, threads=processes, in_place=True)
+        return vectorized_floyd_warshall(matrix, directed=True, in_place=True)
+    raise ValueError(f'Unknown method {method}')
+
+
 def floyd_warshall(graph, directed=False):
     """
     Find all minimal distances between elements in a weighted graph.
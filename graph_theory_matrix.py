@@ -4,6 +4,8 @@ Graph theory algorithms implemented in python
 The focus is on algorithms for simple weighted graphs.
 """
 
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
 def random_graph(N=10, weight_max=10, directed=False):
@@ -32,6 +34,255 @@ def random_euclidean_graph(N=10, weight_max=10):
     graph = graph + np.diag(N * [np.inf])
     return graph, coordinates
 
+def from_edge_list(vertices, edges, directed=False):
+    """
+    Construct the matrix for a graph given as a list of vertices and a list of weighted edges [u, v, w].
+
+    Row and column i belong to vertices[i]. Missing edges and the diagonal are inf, and of several parallel edges
+    the lowest weight is kept.
+    """
+    N = len(vertices)
+    index = {v: i for i, v in reversed(list(enumerate(vertices)))}
+    rows = np.fromiter((index[e[0]] for e in edges), dtype=np.int64, count=len(edges))
+    columns = np.fromiter((index[e[1]] for e in edges), dtype=np.int64, count=len(edges))
+    weights = np.fromiter((e[2] for e in edges), dtype=np.float64, count=len(edges))
+
+    graph = np.full((N, N), np.inf)
+    np.minimum.at(graph, (rows, columns), weights)
+    if not directed:
+        np.minimum.at(graph, (columns, rows), weights)
+    graph[np.diag_indices(N)] = np.inf
+
+    return graph
+
+def to_edge_list(vertices, graph, directed=False):
+    """
+    Construct the list of weighted edges [u, v, w] for the finite entries of a graph matrix.
+
+    For undirected graphs each pair of vertices gives one edge [vertices[i], vertices[j], w] with i < j, weighted by
+    the lower of graph[i, j] and graph[j, i]. The edges are listed row by row.
+    """
+    N = len(graph)
+    if directed:
+        rows, columns = np.nonzero(~np.eye(N, dtype=bool))
+        weights = graph[rows, columns]
+    else:
+        rows, columns = np.triu_indices(N, 1)
+        weights = np.minimum(graph[rows, columns], graph[columns, rows])
+
+    finite = np.isfinite(weights)
+    labels = np.empty(N, dtype=object)
+    labels[:] = list(vertices)
+
+    return [list(e) for e in zip(labels[rows[finite]], labels[columns[finite]], weights[finite].tolist())]
+
+def degrees(graph):
+    """
+    Find the degree of every vertex in a graph matrix, where an edge is a finite entry off the diagonal.
+    """
+    finite = np.isfinite(graph)
+    finite[np.diag_indices(len(graph))] = False
+    return np.count_nonzero(finite, axis=1)
+
+class WeightMatrix:
+    """
+    A graph matrix looked up by vertex labels, so weights[u, v] is the weight of the edge between u and v.
+
+    This lets the list form algorithms in grafteori_module, which take a weight index of vertex pairs, run on a
+    matrix instead of a dictionary of edges. The matrix can also be a DistanceMatrix kept on disk.
+    """
+
+    def __init__(self, vertices, graph):
+        self.vertices = list(vertices)
+        self.index = {v: i for i, v in reversed(list(enumerate(self.vertices)))}
+        self.graph = graph
+
+    def __getitem__(self, pair):
+        u, v = pair
+        weight = self.graph[self.index[u], self.index[v]]
+        if weight == np.inf:
+            raise KeyError(pair)
+        return weight.item()
+
+    def __contains__(self, pair):
+        u, v = pair
+        return u in self.index and v in self.index and self.graph[self.index[u], self.index[v]] != np.inf
+
+    def get(self, pair, default=None):
+        return self[pair] if pair in self else default
+
+class DistanceMatrix:
+    """
+    A distance matrix kept in a .npy file on disk and read through np.memmap, so only the rows in use are in memory.
+
+    The file holds either the full N x N matrix or, with condensed=True, only the upper triangle of a symmetric
+    matrix as a flat array of length N (N - 1) / 2. Either way the matrix is read like a graph matrix, one entry, one
+    row or one block of rows at a time, with inf on the diagonal of a condensed matrix. A matrix written once, e.g. a
+    metric closure, is opened again in a later process with DistanceMatrix(path).
+
+    >>> import os, shutil, tempfile
+    >>> rng = np.random.default_rng(0)
+    >>> graph = rng.integers(1, 20, (7, 7)).astype(float)
+    >>> graph = np.minimum(graph, graph.T)
+    >>> graph[np.diag_indices(7)] = np.inf
+    >>> folder = tempfile.mkdtemp()
+    >>> for condensed in (False, True):
+    ...     matrix = DistanceMatrix.from_matrix(os.path.join(folder, f'{condensed}.npy'), graph, condensed, block_rows=3)
+    ...     same_rows = np.array_equal(matrix.rows(0, 7), graph) and np.array_equal(matrix.rows(3, 7, 2), graph[3:])
+    ...     closure = floyd_warshall(matrix, block_rows=3)
+    ...     print(condensed, same_rows, np.array_equal(closure.rows(0, 7), floyd_warshall(graph)))
+    False True True
+    True True True
+    >>> del matrix, closure
+    >>> shutil.rmtree(folder)
+    """
+
+    def __init__(self, path, mode='r+'):
+        self.path = path
+        self.data = np.lib.format.open_memmap(path, mode=mode)
+        self.condensed = self.data.ndim == 1
+        if self.condensed:
+            self.N = int(round((1 + np.sqrt(1 + 8 * len(self.data))) / 2))
+        else:
+            self.N = len(self.data)
+
+    @classmethod
+    def create(cls, path, N, condensed=False, dtype=np.float64):
+        """
+        Create a matrix file for N vertices where every entry is inf.
+        """
+        shape = (N * (N - 1) // 2,) if condensed else (N, N)
+        data = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+        data[:] = np.inf
+        data.flush()
+        del data
+        return cls(path)
+
+    @classmethod
+    def from_matrix(cls, path, graph, condensed=False, dtype=np.float64, block_rows=1024):
+        """
+        Write a graph matrix, or another DistanceMatrix, to a matrix file block by block.
+        """
+        matrix = cls.create(path, len(graph), condensed, dtype)
+        for start in range(0, len(graph), block_rows):
+            if isinstance(graph, DistanceMatrix):
+                block = graph.rows(start, start + block_rows)
+            else:
+                block = np.asarray(graph[start:start + block_rows])
+            matrix.write_rows(start, block)
+        matrix.flush()
+        return matrix
+
+    def __len__(self):
+        return self.N
+
+    @property
+    def shape(self):
+        return self.N, self.N
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    def _offset(self, i):
+        # Position of the entry (i, i + 1) in the condensed upper triangle, for an int or an array of ints
+        return i * self.N - i * (i + 1) // 2
+
+    def __getitem__(self, pair):
+        i, j = pair
+        if not self.condensed:
+            return self.data[i, j]
+        if i == j:
+            return self.data.dtype.type(np.inf)
+        i, j = min(i, j), max(i, j)
+        return self.data[self._offset(i) + j - i - 1]
+
+    def weights(self, rows, columns):
+        """
+        The entries graph[rows[k], columns[k]] for arrays of row and column indices.
+        """
+        rows, columns = np.asarray(rows), np.asarray(columns)
+        if not self.condensed:
+            return self.data[rows, columns]
+        i, j = np.minimum(rows, columns), np.maximum(rows, columns)
+        weights = np.full(len(i), np.inf, dtype=self.data.dtype)
+        off_diagonal = i != j
+        i, j = i[off_diagonal], j[off_diagonal]
+        weights[off_diagonal] = self.data[self._offset(i) + j - i - 1]
+        return weights
+
+    def rows(self, start, stop, block_rows=1024):
+        """
+        The rows start, ..., stop - 1 as an array in memory.
+        """
+        stop = min(stop, self.N)
+        if not self.condensed:
+            return np.array(self.data[start:stop])
+
+        block = np.empty((stop - start, self.N), dtype=self.data.dtype)
+        columns = np.arange(start, stop)
+        for i in range(start, stop):
+            block[i - start, i + 1:] = self.data[self._offset(i):self._offset(i + 1)]
+        for first in range(0, start, block_rows):
+            # The columns start, ..., stop - 1 of the earlier rows are the lower part of the block
+            j = np.arange(first, min(first + block_rows, start))[:, None]
+            block[:, first:first + len(j)] = self.data[self._offset(j) + columns - j - 1].T
+        square = block[:, start:stop]
+        lower = np.tril_indices(stop - start, -1)
+        square[lower] = square.T[lower]
+        square[np.diag_indices(stop - start)] = np.inf
+        return block
+
+    def row(self, i):
+        return self.rows(i, i + 1)[0]
+
+    def blocks(self, block_rows=1024):
+        """
+        Iterate over the matrix as pairs (start, rows(start, start + block_rows)).
+        """
+        for start in range(0, self.N, block_rows):
+            yield start, self.rows(start, start + block_rows, block_rows)
+
+    def write_rows(self, start, block):
+        """
+        Overwrite the rows start, start + 1, ... with a block of rows. A condensed matrix keeps the upper triangle.
+        """
+        if not self.condensed:
+            self.data[start:start + len(block)] = block
+            return
+        for i in range(start, start + len(block)):
+            self.data[self._offset(i):self._offset(i + 1)] = block[i - start, i + 1:]
+
+    def flush(self):
+        self.data.flush()
+
+def tour_length(graph, tour):
+    """
+    Find the length of a walk through the vertices with the indices in tour, such as a closed tour that ends in its
+    first vertex. The graph is a matrix or a DistanceMatrix, of which only the entries on the walk are read.
+    """
+    tour = np.asarray(tour)
+    if isinstance(graph, DistanceMatrix):
+        return graph.weights(tour[:-1], tour[1:]).sum().item()
+    return np.asarray(graph)[tour[:-1], tour[1:]].sum().item()
+
+def nearest_neighbour_tour(graph, start=0):
+    """
+    Construct a closed tour by going from each vertex to the nearest vertex not yet visited, starting at start.
+
+    One row of the matrix is read per step, so the tour can be found for a DistanceMatrix on disk.
+    """
+    N = len(graph)
+    visited = np.zeros(N, dtype=bool)
+    tour = [start]
+    visited[start] = True
+    for _ in range(N - 1):
+        row = graph.row(tour[-1]) if isinstance(graph, DistanceMatrix) else np.asarray(graph[tour[-1]])
+        tour.append(int(np.argmin(np.where(visited, np.inf, row))))
+        visited[tour[-1]] = True
+    tour.append(start)
+    return tour
+
 def dijkstra(graph, directed=False):
     """
     Find all minimal distances between elements in a weighted graph.
@@ -72,34 +323,178 @@ def dijkstra(graph, directed=False):
 
         return distances
 
-def floyd_warshall(graph, directed=False):
+def floyd_warshall(graph, directed=False, block_rows=256, dtype=None, in_place=False):
     """
     Find all minimal distances between elements in a weighted graph.
+
+    Each pivot k updates the matrix with np.minimum(D, D[:, k, None] + D[None, k, :]), block_rows rows at a time so
+    the temporary block stays small. With dtype=np.float32 the distances are found in single precision, which halves
+    the memory and is faster, and with in_place=True the graph matrix itself is overwritten, so dtype must then be
+    None or the dtype of the graph. For undirected graphs the upper triangle of the matrix is used. The diagonal is
+    kept as it is.
+
+    A DistanceMatrix is updated in place on disk, reading and writing block_rows rows at a time. Every pivot reads and
+    writes the whole file, so this takes N passes over the file and is only practical while the file fits in the
+    page cache. blocked_floyd_warshall takes a DistanceMatrix too and needs only one pass per tile of pivots, and for
+    large graphs in memory it works on tiles that fit in the cache and uses several cores.
+
+    The lower triangle is ignored for undirected graphs:
+
+    >>> graph = np.array([[np.inf, 1, 5], [9, np.inf, 1], [1, 9, np.inf]])
+    >>> floyd_warshall(graph)
+    array([[inf,  1.,  2.],
+           [ 1., inf,  1.],
+           [ 2.,  1., inf]])
+    >>> floyd_warshall(graph, directed=True, block_rows=2)
+    array([[inf,  1.,  2.],
+           [ 2., inf,  1.],
+           [ 1.,  2., inf]])
+    >>> floyd_warshall(graph, dtype=np.float32).dtype
+    dtype('float32')
+    >>> floyd_warshall(graph, dtype=np.float32, in_place=True)
+    Traceback (most recent call last):
+        ...
+    ValueError: in_place=True keeps the dtype float64 of the graph, so dtype=float32 cannot be used
     """
+    if isinstance(graph, DistanceMatrix):
+        return _floyd_warshall_on_disk(graph, block_rows)
+
     N = len(graph)
-    distances = graph.copy()
+    distances, diagonal = _initial_distances(graph, directed, dtype, in_place)
+    buffer = np.empty((min(block_rows, N), N), dtype=distances.dtype)
+    for k in range(N):
+        row_k = distances[k]
+        for start in range(0, N, block_rows):
+            block = distances[start:start + block_rows]
+            through_k = buffer[:len(block)]
+            np.add(block[:, k, None], row_k, out=through_k)
+            np.minimum(block, through_k, out=block)
+    distances[np.diag_indices(N)] = diagonal
 
-    if directed:
-        for i in range(N):
-            for j in range(N):
-                for k in range(N):
-                    if j != k and distances[j, k] > distances[j, i] + distances[i, k]:
-                        distances[j, k] = distances[j, i] + distances[i, k]
+    return distances
 
-        return distances
+def blocked_floyd_warshall(graph, directed=False, tile=256, threads=None, dtype=None, in_place=False):
+    """
+    Find all minimal distances between elements in a weighted graph with the tiled Floyd-Warshall algorithm.
 
-    else:
-        for i in range(N):
-            for j in range(1, N - 1):
-                for k in range(j + 1, N):
-                    if distances[j, k] > distances[j, i] + distances[i, k]:
-                        distances[j, k] = distances[j, i] + distances[i, k]
+    The matrix is split into tiles of tile x tile entries, and the pivots are taken one tile K at a time in three
+    phases: the diagonal tile (K, K) itself, then the tiles in row K and column K, and then all remaining tiles
+    (I, J), which only need the tiles (I, K) and (K, J). The tiles within a phase are independent, so they are
+    updated on a pool of threads while NumPy releases the GIL, and each update only touches three tiles, which stay
+    in the cache. threads=None uses as many threads as there are cores. The options are as for floyd_warshall.
 
-        for i in range(1, N - 1):
-            for j in range(i + 1, N):
-                distances[j, i] = distances[i, j]
+    A DistanceMatrix is updated in place on disk. For each tile K of pivots the rows K are read and closed first, and
+    then every other block of tile rows is read, updated from the rows K and written back, so the file is read and
+    written N / tile times instead of once per pivot as in floyd_warshall. Two blocks of tile x N entries are in
+    memory at a time.
 
-        return distances
+    The distances are the same as from floyd_warshall, up to rounding when the weights are not integers:
+
+    >>> import os, shutil, tempfile
+    >>> rng = np.random.default_rng(1)
+    >>> graph = rng.integers(1, 50, (10, 10)).astype(float)
+    >>> graph[rng.random((10, 10)) < 0.5] = np.inf
+    >>> graph[np.diag_indices(10)] = np.inf
+    >>> all(np.array_equal(blocked_floyd_warshall(graph, directed, tile=3), floyd_warshall(graph, directed))
+    ...     for directed in (False, True))
+    True
+    >>> folder = tempfile.mkdtemp()
+    >>> symmetric = np.triu(graph) + np.triu(graph, 1).T
+    >>> for condensed in (False, True):
+    ...     matrix = DistanceMatrix.from_matrix(os.path.join(folder, f'{condensed}.npy'), symmetric, condensed)
+    ...     closure = blocked_floyd_warshall(matrix, tile=3)
+    ...     print(condensed, np.array_equal(closure.rows(0, 10), floyd_warshall(graph)))
+    False True
+    True True
+    >>> del matrix, closure
+    >>> shutil.rmtree(folder)
+    """
+    if isinstance(graph, DistanceMatrix):
+        with ThreadPoolExecutor(threads) as pool:
+            return _blocked_floyd_warshall_on_disk(graph, tile, pool)
+
+    N = len(graph)
+    distances, diagonal = _initial_distances(graph, directed, dtype, in_place)
+    tiles = [slice(start, min(start + tile, N)) for start in range(0, N, tile)]
+
+    with ThreadPoolExecutor(threads) as pool:
+        for K in tiles:
+            _relax(distances[K, K], distances[K, K], distances[K, K])
+
+            others = [T for T in tiles if T != K]
+            tasks = [pool.submit(_relax, distances[K, J], distances[K, K], distances[K, J]) for J in others]
+            tasks += [pool.submit(_relax, distances[I, K], distances[I, K], distances[K, K]) for I in others]
+            for task in tasks:
+                task.result()
+
+            def relax_tile_row(I):
+                for J in others:
+                    _relax(distances[I, J], distances[I, K], distances[K, J])
+
+            for task in [pool.submit(relax_tile_row, I) for I in others]:
+                task.result()
+
+    distances[np.diag_indices(N)] = diagonal
+
+    return distances
+
+def _relax(target, column, row):
+    # target = min(target, column[:, k] + row[k]) for each pivot k in turn
+    through_k = np.empty_like(target)
+    for k in range(len(row)):
+        np.add(column[:, k, None], row[k], out=through_k)
+        np.minimum(target, through_k, out=target)
+
+def _blocked_floyd_warshall_on_disk(matrix, tile, pool):
+    N = len(matrix)
+    tiles = [slice(start, min(start + tile, N)) for start in range(0, N, tile)]
+
+    def update(I, block, K, row_K):
+        # Bring the block of rows I up to date with the pivots K, keeping its diagonal
+        diagonal = (np.arange(I.stop - I.start), np.arange(I.start, I.stop))
+        kept = block[diagonal]
+        _relax(block[:, K], block[:, K], row_K[:, K])
+        others = [J for J in tiles if J != K]
+        for task in [pool.submit(_relax, block[:, J], block[:, K], row_K[:, J]) for J in others]:
+            task.result()
+        block[diagonal] = kept
+        matrix.write_rows(I.start, block)
+
+    for K in tiles:
+        row_K = matrix.rows(K.start, K.stop)
+        update(K, row_K, K, row_K)
+        for I in tiles:
+            if I != K:
+                update(I, matrix.rows(I.start, I.stop), K, row_K)
+    matrix.flush()
+    return matrix
+
+def _initial_distances(graph, directed, dtype, in_place):
+    # The matrix to update and its diagonal, with the upper triangle copied to the lower one for undirected graphs
+    N = len(graph)
+    if in_place and dtype is not None and np.dtype(dtype) != graph.dtype:
+        raise ValueError(f'in_place=True keeps the dtype {graph.dtype} of the graph, so dtype={np.dtype(dtype)} '
+                         'cannot be used')
+    distances = graph if in_place else np.array(graph, dtype=dtype)
+
+    if not directed:
+        lower = np.tril_indices(N, -1)
+        distances[lower] = distances.T[lower]
+
+    return distances, distances[np.diag_indices(N)].copy()
+
+def _floyd_warshall_on_disk(matrix, block_rows):
+    N = len(matrix)
+    for k in range(N):
+        row_k = matrix.row(k)
+        for start, block in matrix.blocks(block_rows):
+            diagonal = (np.arange(len(block)), np.arange(start, start + len(block)))
+            kept = block[diagonal]
+            np.minimum(block, block[:, k:k + 1] + row_k, out=block)
+            block[diagonal] = kept
+            matrix.write_rows(start, block)
+    matrix.flush()
+    return matrix
 
 def fleury(multigraph, max_iterations=10 ** 3):
     """